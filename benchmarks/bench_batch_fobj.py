@@ -0,0 +1,59 @@
+# Generations/sec with per-individual and batch object function (Rastrigin, Rosenbrock)
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+
+
+def rastrigin(args):
+    A = 10
+    data = np.array(args[0])
+    return -A + np.sum(data**2 - A * np.cos(2*np.pi*data))
+
+
+def rastrigin_batch(args):
+    A = 10
+    data = args[0]
+    return -A + np.sum(data**2 - A * np.cos(2*np.pi*data), axis=0)
+
+
+def rosenbrock(args):
+    data = args[0]
+    return -np.sum(100 * (data[:-1] - data[1:])**2 + (data[:-1] - 1)**2)
+
+
+def rosenbrock_batch(args):
+    data = args[0]
+    return -np.sum(100 * (data[:-1] - data[1:])**2 + (data[:-1] - 1)**2, axis=0)
+
+
+def measure(f, batch, ndim, num_gen, use_multiprocess):
+    with tempfile.TemporaryDirectory() as log_dir:
+        np.random.seed(0)
+        solver = evolve.EA(ndim, log_dir=log_dir, mu=3, num_select=5, num_offspring=200, num_parent=400,
+                           use_multiprocess=use_multiprocess, batch_crossover=True)
+        solver.set_object_func(f, batch=batch)
+        solver.set_min_max(np.ones(ndim) * (-5), np.ones(ndim) * 5)
+        solver.check_setting()
+        with solver:
+            solver.random_initialization()
+            t0 = time.perf_counter()
+            for n in range(num_gen):
+                solver.next_generation()
+            dt = time.perf_counter() - t0
+    return num_gen / dt
+
+
+if __name__ == "__main__":
+    num_gen = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    ndim = 20
+    for name, f, fb in [("rastrigin", rastrigin, rastrigin_batch), ("rosenbrock", rosenbrock, rosenbrock_batch)]:
+        for use_multiprocess in [False, True]:
+            r_single = measure(f, False, ndim, num_gen, use_multiprocess)
+            r_batch = measure(fb, True, ndim, num_gen, use_multiprocess)
+            print("%-10s multiprocess=%-5s single: %8.2f gen/s, batch: %8.2f gen/s (%.1fx)"%(
+                name, use_multiprocess, r_single, r_batch, r_batch/r_single))
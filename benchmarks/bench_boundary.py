@@ -0,0 +1,47 @@
+# Compare the boundary modes (genalg.boundary) on the standard functions, with the optimum moved close
+# to the boundary so that many crossover draws fall outside. Reports the time per generation, the best
+# fitness, and the mean reject / repair rate per generation
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import genalg.evolve as evolve
+from functions import FUNCTIONS
+
+
+def run(f, bound, ndim, mode, max_iter, shift=0.9):
+    # optimum at shift*bound
+    fobj = lambda args: f([np.asarray(args[0]) - shift*bound, args[1]])
+    with tempfile.TemporaryDirectory() as log_dir:
+        solver = evolve.EA(ndim, log_dir=log_dir, mu=3, num_select=10, num_offspring=50, num_parent=100, seed=0,
+                           batch_crossover=True)
+        solver.set_object_func(fobj)
+        solver.set_min_max(np.ones(ndim) * (-bound), np.ones(ndim) * bound)
+        solver.set_boundary(mode)
+        solver.random_initialization()
+        rec = []
+        t0 = time.perf_counter()
+        for n in range(max_iter):
+            solver.next_generation()
+            rec.append(solver.boundary.last_record)
+        wall = time.perf_counter() - t0
+        solver.close()
+    return (wall / max_iter, np.max(solver.fit_score), np.mean([r["reject_rate"] for r in rec]),
+            np.mean([r["repair_rate"] for r in rec]), np.sum([r["num_random"] for r in rec]))
+
+
+if __name__ == "__main__":
+    max_iter = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("%-10s %5s %-8s %10s %12s %8s %8s %8s"%("function", "dim", "mode", "gen (ms)", "best", "reject", "repair",
+                                                  "random"))
+    for name in ["sphere", "rastrigin"]:
+        f, bound = FUNCTIONS[name]
+        for ndim in [10, 100]:
+            for mode in ["reject", "clip", "reflect", "wrap"]:
+                t, best, reject, repair, num_random = run(f, bound, ndim, mode, max_iter)
+                print("%-10s %5d %-8s %10.2f %12.4g %8.2f %8.2f %8d"%(name, ndim, mode, t*1e3, best, reject, repair,
+                                                                     num_random))
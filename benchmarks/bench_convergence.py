@@ -0,0 +1,54 @@
+# Number of evaluations and final fitness of fixed-iteration runs and
+# runs with early stopping / restart / adaptive num_offspring (Rastrigin, Rosenbrock)
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+
+
+def rastrigin(args):
+    A = 10
+    data = args[0]
+    return -A * len(data) - np.sum(data**2 - A * np.cos(2*np.pi*data), axis=0)
+
+
+def rosenbrock(args):
+    data = args[0]
+    return -np.sum(100 * (data[:-1] - data[1:])**2 + (data[:-1] - 1)**2, axis=0)
+
+
+PROBLEMS = {"rastrigin": (rastrigin, 10, 5.12, "pcx"), "rosenbrock": (rosenbrock, 20, 10, "undx")}
+SETTINGS = {"fixed": {},
+            "early stop": {"window": 50, "tol": 1e-4},
+            "restart": {"window": 50, "tol": 1e-4, "max_restart": 2, "num_elite": 5},
+            "adaptive": {"window": 50, "tol": 1e-4, "adapt_offspring": True}}
+
+
+def measure(name, setting, max_iter, seed):
+    f, ndim, pmax, crossover_type = PROBLEMS[name]
+    with tempfile.TemporaryDirectory() as log_dir:
+        np.random.seed(seed)
+        solver = evolve.EA(ndim, log_dir=log_dir, mu=3, num_select=5, num_offspring=20,
+                           num_parent=50, crossover_type=crossover_type, batch_crossover=True, log_format="binary")
+        solver.set_object_func(f, batch=True)
+        solver.set_min_max(np.ones(ndim) * (-pmax), np.ones(ndim) * pmax)
+        solver.run(max_iter, **SETTINGS[setting])
+    return solver.num_eval, np.nanmax(solver.fit_score), solver.clock
+
+
+if __name__ == "__main__":
+    max_iter = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seeds = range(5)
+    print("%-11s %-11s %10s %10s %12s %9s"%("problem", "setting", "num_gen", "num_eval", "best (mean)", "saving"))
+    for name in PROBLEMS:
+        num_eval_fixed = None
+        for setting in SETTINGS:
+            res = np.array([measure(name, setting, max_iter, seed) for seed in seeds])
+            num_eval = np.mean(res[:, 0])
+            if num_eval_fixed is None:
+                num_eval_fixed = num_eval
+            print("%-11s %-11s %10.0f %10.0f %12.5f %8.1f%%"%(name, setting, np.mean(res[:, 2]), num_eval,
+                                                            np.mean(res[:, 1]), 100*(1 - num_eval/num_eval_fixed)))
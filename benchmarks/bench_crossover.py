@@ -0,0 +1,66 @@
+# Microbenchmark of the per-offspring crossover against the batched one
+# The distributions of both are compared first (moments and KS test of each parameter on the same parents)
+import os
+import sys
+import time
+import numpy as np
+from scipy.stats import ks_2samp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+
+
+def sample_offspring(crossover_type, batch, num_child, param_vec, seed):
+    num_params, num_parent = param_vec.shape
+    solver = evolve.EA(num_params, mu=3, num_select=5, num_offspring=num_child, num_parent=num_parent,
+                       crossover_type=crossover_type, batch_crossover=batch, seed=seed)
+    # wide boundary, the offspring are not redrawn
+    solver.set_min_max(np.ones(num_params) * (-100), np.ones(num_params) * 100)
+    solver.param_vec = param_vec.copy()
+    return solver.crossover(num_child)
+
+
+def check_distribution(crossover_type, num_params=5, num_parent=20, num_child=20000, alpha=1e-3):
+    # loop and batch offspring of the same parents: mean / std within 5 standard errors and KS test per parameter
+    param_vec = np.random.default_rng(0).uniform(-1, 1, [num_params, num_parent])
+    x_loop = sample_offspring(crossover_type, False, num_child, param_vec, seed=1)
+    x_batch = sample_offspring(crossover_type, True, num_child, param_vec, seed=2)
+
+    se_mean = np.sqrt((np.var(x_loop, axis=1) + np.var(x_batch, axis=1)) / num_child)
+    z_mean = np.abs(np.mean(x_loop, axis=1) - np.mean(x_batch, axis=1)) / se_mean
+    se_std = np.sqrt((np.var(x_loop, axis=1) + np.var(x_batch, axis=1)) / (2 * num_child))
+    z_std = np.abs(np.std(x_loop, axis=1) - np.std(x_batch, axis=1)) / se_std
+    p_ks = np.array([ks_2samp(x_loop[n], x_batch[n]).pvalue for n in range(num_params)])
+    print("%-5s mean z %.2f, std z %.2f, KS p (min) %.3g"%(crossover_type, np.max(z_mean), np.max(z_std), np.min(p_ks)))
+    if np.max(z_mean) > 5 or np.max(z_std) > 5 or np.min(p_ks) < alpha / num_params:
+        raise AssertionError("%s batch crossover does not match the per-offspring one"%(crossover_type))
+
+
+def measure(solver, num_repeat):
+    t0 = time.perf_counter()
+    for n in range(num_repeat):
+        solver.crossover()
+    return (time.perf_counter() - t0) / num_repeat
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sizes = [(10, 20), (10, 200), (100, 20), (100, 200), (100, 500)]
+    for crossover_type in ["pcx", "undx"]:
+        check_distribution(crossover_type)
+
+    print("%-5s %8s %8s %12s %12s %8s"%("type", "params", "child", "loop (ms)", "batch (ms)", "speedup"))
+    for crossover_type in ["pcx", "undx"]:
+        for num_params, num_offspring in sizes:
+            np.random.seed(0)
+            solver = evolve.EA(num_params, mu=3, num_select=5, num_offspring=num_offspring, num_parent=2*num_offspring,
+                               crossover_type=crossover_type)
+            solver.set_min_max(np.ones(num_params) * (-5), np.ones(num_params) * 5)
+            solver.param_vec = np.random.uniform(-1, 1, [num_params, solver.num_parent])
+
+            solver.batch_crossover = False
+            t_loop = measure(solver, num_repeat)
+            solver.batch_crossover = True
+            t_batch = measure(solver, num_repeat)
+            print("%-5s %8d %8d %12.3f %12.3f %7.1fx"%(crossover_type, num_params, num_offspring,
+                                                       t_loop*1e3, t_batch*1e3, t_loop/t_batch))
@@ -0,0 +1,77 @@
+# Import time of genalg and worker spawn latency
+#   import: median wall time of python -c "<statement>" in a fresh interpreter
+#   spawn: time to start a "spawn" process that imports genalg.evolve and returns one evaluation,
+#          and to get the first result from a PoolEvaluator
+# The "eager" row imports everything that import genalg used to load (matplotlib, scipy, multiprocess)
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+STATEMENTS = [("python", "pass"),
+              ("numpy", "import numpy"),
+              ("genalg", "import genalg"),
+              ("genalg.evolve", "import genalg.evolve"),
+              ("eager", "import genalg.evolve, genalg.logger, matplotlib.pyplot, scipy.linalg, multiprocess")]
+
+
+def time_import(stmt, num_repeat):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    t = []
+    for n in range(num_repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", stmt], env=env, check=True)
+        t.append(time.perf_counter() - t0)
+    return np.median(t)
+
+
+def sphere(args):
+    return -np.sum(args[0]**2)
+
+
+def spawn_target(queue):
+    import genalg.evolve
+    queue.put(sphere([np.zeros(3), 0]))
+
+
+def time_spawn(num_repeat):
+    import multiprocess as mp
+    ctx = mp.get_context("spawn")
+    t = []
+    for n in range(num_repeat):
+        queue = ctx.Queue()
+        t0 = time.perf_counter()
+        p = ctx.Process(target=spawn_target, args=(queue,))
+        p.start()
+        queue.get()
+        t.append(time.perf_counter() - t0)
+        p.join()
+    return np.median(t)
+
+
+def time_pool(num_repeat, num_process=4):
+    from genalg.evaluator import PoolEvaluator
+    t = []
+    for n in range(num_repeat):
+        evaluator = PoolEvaluator(num_process)
+        t0 = time.perf_counter()
+        evaluator.map(sphere, [[np.zeros(3), i] for i in range(num_process)])
+        t.append(time.perf_counter() - t0)
+        evaluator.close()
+    return np.median(t)
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("%-15s %10s"%("import", "wall (ms)"))
+    for name, stmt in STATEMENTS:
+        print("%-15s %10.1f"%(name, time_import(stmt, num_repeat)*1e3))
+
+    print("\n%-15s %10s"%("worker", "wall (ms)"))
+    print("%-15s %10.1f"%("spawn", time_spawn(num_repeat)*1e3))
+    print("%-15s %10.1f"%("pool (first)", time_pool(num_repeat)*1e3))
@@ -0,0 +1,101 @@
+# Compare EA.crossover_pcx / EA.crossover_undx (genalg._kernels) against the per-offspring code they replaced
+# The kernels are compiled with numba when it is installed, set GENALG_NO_JIT=1 to time the NumPy versions
+import os
+import sys
+import time
+import numpy as np
+from scipy.linalg import null_space
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+from genalg import _kernels
+from genalg.evolve import get_distance, gram_schmidt, get_norm, remove_element
+
+
+def old_crossover_undx(solver):
+    id_select, id_remain = solver.pick_id(solver.num_parent, solver.mu)
+    g_vec = np.average(solver.param_vec[:, id_select], axis=1)
+    d_vec = solver.param_vec[:, id_select[:-1]] - g_vec[:, np.newaxis]
+    if get_norm(d_vec) < 1e-5:
+        return g_vec
+    basis = null_space(d_vec.T)
+    nd = id_remain[int(solver.rng.random() * len(id_remain))]
+    v = solver.param_vec[:, nd] - g_vec
+    coord = np.array([np.dot(v, basis[:,n]) for n in range(basis.shape[1])])
+    D = np.sqrt(np.sum(coord**2))
+    offspring = g_vec
+    eta = solver.rng.standard_normal((solver.mu-1, 1)) * solver.sgm_eta
+    offspring += np.squeeze(np.dot(d_vec, eta))
+    xi = solver.rng.standard_normal((basis.shape[1], 1)) * solver.sgm_xi
+    offspring += np.squeeze(D * np.dot(basis, xi))
+    return offspring
+
+
+def old_crossover_pcx(solver):
+    id_select, id_remain = solver.pick_id(solver.num_parent, solver.mu)
+    g_vec = np.average(solver.param_vec[:, id_select], axis=1)
+    nd = id_select[int(solver.rng.random() * len(id_select))]
+    x_pick = solver.param_vec[:, nd]
+    d_vec = x_pick - g_vec
+    if all(np.array(d_vec) == 0):
+        return x_pick
+    id_select = remove_element(list(id_select), nd)
+    D = 0
+    for i in id_select:
+        D += get_distance(solver.param_vec[:, i], d_vec)
+    D /= solver.mu - 1
+    tmp_vec = np.concatenate([d_vec.reshape([-1, 1]), solver.param_vec[:, id_select]], axis=1)
+    basis = gram_schmidt(tmp_vec)[:, 1:]
+    offspring = x_pick.copy()
+    offspring += solver.rng.standard_normal() * solver.sgm_eta * d_vec
+    offspring += np.squeeze(D * np.dot(basis, solver.rng.standard_normal((solver.mu-1, 1))) * solver.sgm_xi)
+    return offspring
+
+
+def check_kernels(num_trial=200, seed=0):
+    # the kernels in use (compiled with numba) against the NumPy versions on the same random inputs
+    rng = np.random.default_rng(seed)
+    err = {"pcx": 0, "undx": 0, "perturb": 0}
+    for n in range(num_trial):
+        num_params, mu = rng.integers(2, 50), rng.integers(2, 10)
+        x_sel = rng.uniform(-5, 5, (num_params, mu))
+        if n % 10 == 0:
+            x_sel[:] = np.round(x_sel[:, :1] * 4) / 4 # identical parents (exact mean, d_vec = 0)
+        eta, xi, z = rng.standard_normal(), rng.standard_normal(mu-1), rng.standard_normal(num_params)
+        x_extra = rng.uniform(-5, 5, num_params)
+        err["pcx"] = max(err["pcx"], np.max(np.abs(_kernels.pcx_offspring(x_sel, eta, xi, 0.5, 0.2)
+                                                   - _kernels._pcx_numpy(x_sel, eta, xi, 0.5, 0.2))))
+        err["undx"] = max(err["undx"], np.max(np.abs(_kernels.undx_offspring(x_sel, x_extra, xi, z, 0.5, 0.2)
+                                                     - _kernels._undx_numpy(x_sel, x_extra, xi, z, 0.5, 0.2))))
+        pmin, pmax, step = -np.ones(num_params), np.ones(num_params), rng.standard_normal(num_params)
+        x = rng.uniform(-1, 1, num_params)
+        err["perturb"] = max(err["perturb"], np.max(np.abs(_kernels.perturb_clip(x.copy(), step, pmin, pmax)
+                                                           - _kernels._perturb_clip_numpy(x, step, pmin, pmax))))
+    for key, val in err.items():
+        print("%-8s max |kernel - numpy| = %.2e"%(key, val))
+        if val > 1e-8:
+            raise AssertionError("%s kernel differs from the NumPy version (%e)"%(key, val))
+
+
+def measure(f, num_repeat):
+    f() # first call compiles the kernel
+    t0 = time.perf_counter()
+    for n in range(num_repeat):
+        f()
+    return (time.perf_counter() - t0) / num_repeat
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print("numba: %s"%(_kernels.HAS_NUMBA))
+    check_kernels()
+    print("%-5s %8s %4s %12s %12s %9s"%("type", "params", "mu", "old (us)", "kernel (us)", "speedup"))
+    for num_params, mu in [(10, 3), (100, 3), (100, 10), (1000, 3)]:
+        solver = evolve.EA(num_params, mu=mu, num_select=5, num_offspring=50, num_parent=100, seed=0)
+        solver.set_min_max(np.ones(num_params) * (-5), np.ones(num_params) * 5)
+        solver.param_vec = solver.rng.uniform(-5, 5, (num_params, 100))
+        for kind, old, new in [("pcx", old_crossover_pcx, solver.crossover_pcx),
+                               ("undx", old_crossover_undx, solver.crossover_undx)]:
+            t_old = measure(lambda: old(solver), num_repeat)
+            t_new = measure(new, num_repeat)
+            print("%-5s %8d %4d %12.1f %12.1f %8.1fx"%(kind, num_params, mu, t_old*1e6, t_new*1e6, t_old/t_new))
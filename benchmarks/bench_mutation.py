@@ -0,0 +1,51 @@
+# Compare EA.mutate (binomial count + sampled positions, genalg.mutation) against the per-gene loop
+# it replaced, and time each mutation operator
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+from genalg.mutation import MUTATIONS
+
+
+def old_mutate(solver, offspring, p_th):
+    for n in range(offspring.shape[1]):
+        for i in range(solver.num_params):
+            if np.random.rand() < p_th:
+                sgm = (solver.pmax[i] - solver.pmin[i])/5
+                x = offspring[i, n] + np.random.randn()*sgm
+                if x > solver.pmax[i]:
+                    x = solver.pmax[i]
+                if x < solver.pmin[i]:
+                    x = solver.pmin[i]
+                offspring[i, n] = x
+    return offspring
+
+
+def measure(f, num_repeat):
+    t0 = time.perf_counter()
+    for n in range(num_repeat):
+        f()
+    return (time.perf_counter() - t0) / num_repeat
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sizes = [(100, 100), (1000, 100), (1000, 500)]
+
+    print("%-10s %8s %8s %10s %12s %12s %9s"%("op", "params", "child", "rate", "loop (ms)", "sparse (ms)", "speedup"))
+    for num_params, num_offspring in sizes:
+        for rate in [0.01/num_params, 1/num_params]:
+            solver = evolve.EA(num_params, mu=3, num_select=5, num_offspring=num_offspring, num_parent=2*num_offspring,
+                               seed=0, mutation_rate=rate)
+            solver.set_min_max(np.ones(num_params) * (-5), np.ones(num_params) * 5)
+            offspring = np.random.uniform(-1, 1, [num_params, num_offspring])
+
+            t_loop = measure(lambda: old_mutate(solver, offspring, rate), num_repeat)
+            for kind in MUTATIONS:
+                solver.set_mutation(kind)
+                t_sparse = measure(lambda: solver.mutate(offspring), num_repeat)
+                print("%-10s %8d %8d %10.1e %12.3f %12.3f %8.1fx"%(kind, num_params, num_offspring, rate,
+                                                                  t_loop*1e3, t_sparse*1e3, t_loop/t_sparse))
@@ -0,0 +1,59 @@
+# Compare genalg.pareto.non_dominated_sort (dominance matrix, vectorized peeling) against the
+# loop version of the fast non-dominated sort (K. Deb et al., 2002), and time the NSGA-II selection
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genalg.pareto import non_dominated_sort, select_nsga2
+
+
+def old_non_dominated_sort(objectives):
+    num = len(objectives)
+    dominated = [[] for _ in range(num)]
+    num_dom = np.zeros(num, dtype=int)
+    for i in range(num):
+        for j in range(num):
+            if np.all(objectives[i] >= objectives[j]) and np.any(objectives[i] > objectives[j]):
+                dominated[i].append(j)
+            elif np.all(objectives[j] >= objectives[i]) and np.any(objectives[j] > objectives[i]):
+                num_dom[i] += 1
+    rank = np.zeros(num, dtype=int)
+    front = [i for i in range(num) if num_dom[i] == 0]
+    r = 0
+    while len(front) > 0:
+        next_front = []
+        for i in front:
+            rank[i] = r
+            for j in dominated[i]:
+                num_dom[j] -= 1
+                if num_dom[j] == 0:
+                    next_front.append(j)
+        front = next_front
+        r += 1
+    return rank
+
+
+def measure(f, num_repeat):
+    t0 = time.perf_counter()
+    for n in range(num_repeat):
+        f()
+    return (time.perf_counter() - t0) / num_repeat
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rng = np.random.default_rng(0)
+    print("%6s %4s %12s %12s %9s %12s"%("N", "M", "loop (ms)", "sort (ms)", "speedup", "nsga2 (ms)"))
+    for num, num_obj in [(100, 2), (100, 3), (500, 3), (2000, 3), (5000, 3)]:
+        objectives = rng.normal(size=(num, num_obj))
+        t_new = measure(lambda: non_dominated_sort(objectives), num_repeat)
+        t_sel = measure(lambda: select_nsga2(objectives, num//2), num_repeat)
+        if num <= 500:
+            if not np.array_equal(old_non_dominated_sort(objectives), non_dominated_sort(objectives)):
+                print("different rank for N=%d"%(num))
+            t_old = measure(lambda: old_non_dominated_sort(objectives), 1)
+            print("%6d %4d %12.2f %12.2f %8.1fx %12.2f"%(num, num_obj, t_old*1e3, t_new*1e3, t_old/t_new, t_sel*1e3))
+        else:
+            print("%6d %4d %12s %12.2f %9s %12.2f"%(num, num_obj, "-", t_new*1e3, "-", t_sel*1e3))
@@ -0,0 +1,55 @@
+# Compare generations/sec of the persistent worker pool against the
+# previous path that opened a new mp.Pool for every chunk of num_process jobs
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import multiprocess as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+
+
+def fpotential(args):
+    # Rastrigin function
+    A = 10
+    data = np.array(args[0])
+    return -A + np.sum(data**2 - A * np.cos(2*np.pi*data))
+
+
+class ChunkedEA(evolve.EA):
+    # evaluation path before the persistent pool was introduced
+    def evaluate(self, params, job_ids):
+        args = [[params[:, n], job_ids[n]] for n in range(len(job_ids))]
+        fitness = []
+        for n0 in range(0, len(args), self.num_process):
+            with mp.Pool(self.num_process) as p:
+                fitness.extend(p.map(self.fobj, args[n0:n0+self.num_process]))
+        return fitness
+
+
+def measure(cls, num_gen, ndim=10, num_process=4):
+    with tempfile.TemporaryDirectory() as log_dir:
+        np.random.seed(100)
+        solver = cls(ndim, log_dir=log_dir, mu=3, num_select=5, num_offspring=20, num_parent=50,
+                     use_multiprocess=True, num_process=num_process)
+        solver.set_object_func(fpotential)
+        solver.set_min_max(np.ones(ndim) * (-5.12), np.ones(ndim) * 5.12)
+        solver.check_setting()
+        with solver:
+            solver.random_initialization()
+            t0 = time.perf_counter()
+            for n in range(num_gen):
+                solver.next_generation()
+            dt = time.perf_counter() - t0
+    return num_gen / dt
+
+
+if __name__ == "__main__":
+    num_gen = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    r_chunk = measure(ChunkedEA, num_gen)
+    r_pool = measure(evolve.EA, num_gen)
+    print("chunked pool   : %8.2f generations/sec"%(r_chunk))
+    print("persistent pool: %8.2f generations/sec"%(r_pool))
+    print("speedup        : %8.2fx"%(r_pool/r_chunk))
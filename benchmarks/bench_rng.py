@@ -0,0 +1,73 @@
+# Compare the crossover / mutation of EA drawing from its buffered Generator (genalg.rng)
+# against the per-draw global np.random calls they replaced
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+
+
+def old_pick_id(max_id, num_pick):
+    id_select = np.random.choice(max_id, num_pick, replace=False)
+    is_remain = np.ones(max_id, dtype=bool)
+    is_remain[id_select] = False
+    return id_select, np.where(is_remain)[0]
+
+
+def old_mutate(solver, offspring):
+    p_th = 0.01/solver.num_params
+    for n in range(offspring.shape[1]):
+        for i in range(solver.num_params):
+            if np.random.rand() < p_th:
+                sgm = (solver.pmax[i] - solver.pmin[i])/5
+                offspring[i, n] = np.clip(offspring[i, n] + np.random.randn()*sgm, solver.pmin[i], solver.pmax[i])
+    return offspring
+
+
+class GlobalRandom:
+    # scalar / small draws of crossover_pcx and crossover_undx from the global state
+    def random(self, size=None):
+        return np.random.rand() if size is None else np.random.rand(*np.atleast_1d(size))
+
+    def standard_normal(self, size=None):
+        return np.random.randn() if size is None else np.random.randn(*np.atleast_1d(size))
+
+    def uniform(self, low=0, high=1, size=None):
+        return np.random.uniform(low, high, size)
+
+
+def measure(f, num_repeat):
+    t0 = time.perf_counter()
+    for n in range(num_repeat):
+        f()
+    return (time.perf_counter() - t0) / num_repeat
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sizes = [(10, 50), (50, 100), (200, 100)]
+
+    print("%-7s %8s %8s %12s %12s %8s"%("op", "params", "child", "global (ms)", "buffer (ms)", "speedup"))
+    for num_params, num_offspring in sizes:
+        solver = evolve.EA(num_params, mu=3, num_select=5, num_offspring=num_offspring, num_parent=2*num_offspring,
+                           seed=0)
+        solver.set_min_max(np.ones(num_params) * (-5), np.ones(num_params) * 5)
+        solver.param_vec = np.random.uniform(-1, 1, [num_params, solver.num_parent])
+        offspring = np.random.uniform(-1, 1, [num_params, num_offspring])
+
+        for crossover_type in ["pcx", "undx"]:
+            solver.crossover_type = crossover_type
+            rng, pick_id = solver.rng, solver.pick_id
+            solver.rng, solver.pick_id = GlobalRandom(), old_pick_id
+            t_global = measure(solver.crossover, num_repeat)
+            solver.rng, solver.pick_id = rng, pick_id
+            t_buffer = measure(solver.crossover, num_repeat)
+            print("%-7s %8d %8d %12.3f %12.3f %7.1fx"%(crossover_type, num_params, num_offspring,
+                                                       t_global*1e3, t_buffer*1e3, t_global/t_buffer))
+
+        t_global = measure(lambda: old_mutate(solver, offspring), num_repeat)
+        t_buffer = measure(lambda: solver.mutate(offspring), num_repeat)
+        print("%-7s %8d %8d %12.3f %12.3f %7.1fx"%("mutate", num_params, num_offspring,
+                                                   t_global*1e3, t_buffer*1e3, t_global/t_buffer))
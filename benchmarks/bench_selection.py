@@ -0,0 +1,112 @@
+# Compare the selection + parent replacement of EA against the list based path
+# it replaced (linear roulette scan, list.remove / pop bookkeeping, with the sign of the
+# fitness shift corrected so that the roulette probabilities are valid)
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import genalg.evolve as evolve
+
+
+def old_pick_id(max_id, num_pick):
+    id_remain = list(range(max_id))
+    id_select = np.random.choice(id_remain, num_pick, replace=False)
+    for nid in id_select:
+        id_remain.remove(nid)
+    return id_select, np.array(id_remain)
+
+
+def old_natural_selection(fitness, num_offspring, num_select, num_opt_select=2):
+    id_tot = list(range(num_offspring+num_select))
+    id_select = []
+    for n in range(num_opt_select):
+        n_best = np.nanargmax(fitness[id_tot])
+        id_tot.pop(n_best)
+        id_select.append(n_best)
+
+    id_nan = np.where(np.isnan(fitness))[0]
+    id_tot = np.delete(id_tot, id_nan)
+
+    fitness_pos = fitness[id_tot]
+    fmin = np.nanmin(fitness_pos)
+    if fmin < 0:
+        fitness_pos -= fmin
+    fitness_pos = list(fitness_pos)
+
+    for n in range(num_select-num_opt_select):
+        prob_select = np.array(fitness_pos) / np.sum(fitness_pos)
+        p = np.random.rand()
+        i, p_cum = 0, 0
+        while p_cum < p:
+            i += 1
+            if (i == len(prob_select)):
+                break
+            p_cum += prob_select[i]
+        i -= 1
+        id_select.append(id_tot[i])
+        fitness_pos.pop(i)
+
+    return list(np.sort(id_select))
+
+
+def old_select_survivors(solver, offspring, fitness, job_ids):
+    id_selected, _ = old_pick_id(solver.num_parent, solver.num_select)
+    pop_scores = np.zeros(solver.num_offspring+solver.num_select)
+    pop_scores[:-solver.num_select] = fitness
+    pop_scores[-solver.num_select:] = solver.fit_score[id_selected]
+    buffer_id = list(job_ids)
+    for nid in id_selected:
+        buffer_id.append(-int(nid)-1)
+    id_selected = list(id_selected)
+
+    id_live = old_natural_selection(pop_scores, solver.num_offspring, solver.num_select)
+    n = 0
+    while n < len(id_live):
+        nid = id_live[n]
+        b_id = buffer_id[nid]
+        if b_id < 0:
+            id_live.remove(nid)
+            buffer_id.pop(nid)
+            id_selected.remove(-b_id-1)
+            for i in range(n, len(id_live)):
+                id_live[i] -= 1
+            n -= 1
+        n += 1
+
+    for n in range(len(id_live)):
+        nid = id_live[n]
+        new_id = id_selected[n]
+        solver.param_vec[:, new_id] = offspring[:, nid]
+        solver.fit_score[new_id] = pop_scores[nid]
+        solver.parent_id[new_id] = buffer_id[nid]
+
+
+def measure(f, solver, offspring, fitness, job_ids, num_repeat):
+    t0 = time.perf_counter()
+    for n in range(num_repeat):
+        f(offspring, fitness, job_ids)
+    return (time.perf_counter() - t0) / num_repeat
+
+
+if __name__ == "__main__":
+    num_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    num_params = 10
+
+    print("%8s %10s %8s %-11s %12s %12s %8s"%("parent", "offspring", "select", "strategy", "old (ms)", "new (ms)", "speedup"))
+    for num_parent, num_offspring, num_select in [(100, 50, 10), (1000, 500, 100), (4000, 2000, 500)]:
+        for strategy in ["roulette", "rank", "tournament", "elitist"]:
+            np.random.seed(0)
+            solver = evolve.EA(num_params, mu=3, num_select=num_select, num_offspring=num_offspring,
+                               num_parent=num_parent, selection=strategy)
+            solver.param_vec = np.random.randn(num_params, num_parent)
+            solver.fit_score = np.random.randn(num_parent)
+            offspring = np.random.randn(num_params, num_offspring)
+            fitness = np.random.randn(num_offspring)
+            job_ids = list(range(num_offspring))
+
+            t_old = measure(lambda *args: old_select_survivors(solver, *args), solver, offspring, fitness, job_ids, num_repeat)
+            t_new = measure(solver.select_survivors, solver, offspring, fitness, job_ids, num_repeat)
+            print("%8d %10d %8d %-11s %12.3f %12.3f %7.1fx"%(num_parent, num_offspring, num_select, strategy,
+                                                            t_old*1e3, t_new*1e3, t_old/t_new))
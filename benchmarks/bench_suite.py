@@ -0,0 +1,192 @@
+# Benchmark suite: EA on the standard functions (benchmarks/functions.py) for every combination of
+# dimension, population size, crossover and evaluation mode. Each case runs in its own process and records
+#   gen_per_sec, eval_per_sec, peak_rss_mb (main / workers), log_bytes, best, evals_to_target
+# The results are written as JSON (with the commit), and can be compared with a previous result file:
+#   python benchmarks/bench_suite.py --out new.json --compare old.json
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import platform
+import subprocess
+import tempfile
+import numpy as np
+import multiprocess as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import genalg.evolve as evolve
+from functions import FUNCTIONS
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+QUICK = {"functions": ["sphere", "rastrigin"], "dims": [2, 10, 100], "pops": [50], "crossovers": ["pcx"],
+         "modes": ["serial"], "max_iter": 50}
+
+
+def get_peak_rss():
+    # peak RSS (MB) of this process and of its terminated children (pool workers)
+    if resource is None:
+        return None, None
+    scale = 1 / 2**20 if sys.platform == "darwin" else 1 / 2**10 # bytes on macOS, KB on Linux
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def get_dir_size(log_dir):
+    return sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir))
+
+
+def run_case(case, opts):
+    f, bound = FUNCTIONS[case["function"]]
+    ndim, num_parent = case["dim"], case["pop"]
+    result = dict(case)
+    with tempfile.TemporaryDirectory() as log_dir:
+        solver = evolve.EA(ndim, log_dir=log_dir, mu=min(3, ndim-1), num_select=5,
+                           num_offspring=num_parent//2, num_parent=num_parent, crossover_type=case["crossover"],
+                           batch_crossover=opts["batch_crossover"], use_multiprocess=case["mode"] == "mp",
+                           num_process=opts["num_process"], log_format=opts["log_format"], seed=opts["seed"])
+        solver.set_object_func(f, batch=opts["batch_fobj"])
+        solver.set_min_max(np.ones(ndim) * (-bound), np.ones(ndim) * bound)
+
+        # first number of evaluations with best fitness >= -target
+        reached = []
+        def on_generation_end(ea, rec):
+            if len(reached) == 0 and np.nanmax(ea.fit_score) >= -opts["target"]:
+                reached.append(ea.num_eval)
+        solver.set_callback(on_generation_end=on_generation_end)
+
+        solver.check_setting()
+        with solver:
+            solver.random_initialization()
+            t0 = time.perf_counter()
+            for n in range(opts["max_iter"]):
+                solver.next_generation()
+                solver.print_log()
+            wall = time.perf_counter() - t0
+            num_eval = solver.num_eval - num_parent
+        solver.close_history()
+
+        result["wall"] = wall
+        result["num_gen"] = opts["max_iter"]
+        result["num_eval"] = int(solver.num_eval)
+        result["gen_per_sec"] = opts["max_iter"] / wall
+        result["eval_per_sec"] = num_eval / wall
+        result["log_bytes"] = get_dir_size(log_dir)
+        result["best"] = float(np.nanmax(solver.fit_score))
+        result["evals_to_target"] = reached[0] if len(reached) > 0 else None
+    result["peak_rss_mb"], result["worker_peak_rss_mb"] = get_peak_rss()
+    return result
+
+
+def run_isolated(case, opts):
+    # fresh process for each case, so that peak RSS belongs to the case
+    recv, send = mp.Pipe(duplex=False)
+
+    def target():
+        try:
+            send.send(run_case(case, opts))
+        except Exception as err:
+            send.send(dict(case, error=repr(err)))
+
+    p = mp.Process(target=target)
+    p.start()
+    result = recv.recv()
+    p.join()
+    return result
+
+
+def get_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def get_key(res):
+    return (res["function"], res["dim"], res["pop"], res["crossover"], res["mode"])
+
+
+def compare(results, fname, threshold=0.1):
+    # ratio new/old of the throughput, and change of the best fitness for the same cases
+    with open(fname, "r") as fid:
+        prev = {get_key(res): res for res in json.load(fid)["results"] if "error" not in res}
+
+    print("\ncompared with %s"%(fname))
+    print("%-11s %5s %5s %-5s %-7s %10s %10s %12s %12s"%("function", "dim", "pop", "xover", "mode", "eval/s",
+                                                         "rss", "best (old)", "best (new)"))
+    num_regress = 0
+    for res in results:
+        old = prev.get(get_key(res))
+        if old is None or "error" in res:
+            continue
+        r_eval = res["eval_per_sec"] / old["eval_per_sec"]
+        r_rss = res["peak_rss_mb"] / old["peak_rss_mb"] if res["peak_rss_mb"] and old["peak_rss_mb"] else np.nan
+        flag = " <" if r_eval < 1 - threshold or r_rss > 1 + threshold else ""
+        num_regress += flag != ""
+        print("%-11s %5d %5d %-5s %-7s %9.2fx %9.2fx %12.4g %12.4g%s"%(res["function"], res["dim"], res["pop"],
+              res["crossover"], res["mode"], r_eval, r_rss, old["best"], res["best"], flag))
+    print("%d case(s) slower or larger by more than %d%%"%(num_regress, 100*threshold))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="genalg benchmark suite")
+    parser.add_argument("--functions", nargs="+", default=list(FUNCTIONS), choices=list(FUNCTIONS))
+    parser.add_argument("--dims", nargs="+", type=int, default=[2, 10, 100, 1000])
+    parser.add_argument("--pops", nargs="+", type=int, default=[50, 200])
+    parser.add_argument("--crossovers", nargs="+", default=["pcx", "undx"], choices=["pcx", "undx"])
+    parser.add_argument("--modes", nargs="+", default=["serial", "mp"], choices=["serial", "mp"])
+    parser.add_argument("--max-iter", type=int, default=100)
+    parser.add_argument("--num-process", type=int, default=4)
+    parser.add_argument("--target", type=float, default=1e-2, help="evals_to_target: best fitness >= -target")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-format", default="text", choices=["text", "binary"])
+    parser.add_argument("--batch-fobj", action="store_true")
+    parser.add_argument("--no-batch-crossover", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="small grid %s"%(QUICK))
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="previous result file")
+    args = parser.parse_args()
+
+    grid = {"functions": args.functions, "dims": args.dims, "pops": args.pops, "crossovers": args.crossovers,
+            "modes": args.modes, "max_iter": args.max_iter}
+    if args.quick:
+        grid.update(QUICK)
+    opts = {"max_iter": grid["max_iter"], "num_process": args.num_process, "target": args.target, "seed": args.seed,
+            "log_format": args.log_format, "batch_fobj": args.batch_fobj,
+            "batch_crossover": not args.no_batch_crossover}
+
+    results = []
+    print("%-11s %5s %5s %-5s %-7s %9s %10s %9s %10s %12s %10s"%("function", "dim", "pop", "xover", "mode", "gen/s",
+          "eval/s", "rss (MB)", "log (KB)", "best", "to target"))
+    for function, dim, pop, crossover, mode in itertools.product(grid["functions"], grid["dims"], grid["pops"],
+                                                                 grid["crossovers"], grid["modes"]):
+        case = {"function": function, "dim": dim, "pop": pop, "crossover": crossover, "mode": mode}
+        res = run_isolated(case, opts)
+        results.append(res)
+        if "error" in res:
+            print("%-11s %5d %5d %-5s %-7s failed: %s"%(function, dim, pop, crossover, mode, res["error"]))
+            continue
+        print("%-11s %5d %5d %-5s %-7s %9.1f %10.1f %9.1f %10.1f %12.4g %10s"%(function, dim, pop, crossover, mode,
+              res["gen_per_sec"], res["eval_per_sec"], res["peak_rss_mb"] or np.nan, res["log_bytes"]/1024,
+              res["best"], res["evals_to_target"]))
+
+    meta = {"commit": get_commit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count(), "options": opts}
+    with open(args.out, "w") as fid:
+        json.dump({"meta": meta, "results": results}, fid, indent=1)
+    print("results are written to %s"%(args.out))
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
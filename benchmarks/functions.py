@@ -0,0 +1,37 @@
+# Standard test functions for the benchmark suite, written as EA fitness (maximization, optimum 0 at x*)
+# args = [x, job_id], x: [ndim] or [ndim, K] (batch object function)
+import numpy as np
+
+
+def sphere(args):
+    x = np.asarray(args[0])
+    return -np.sum(x**2, axis=0)
+
+
+def rastrigin(args):
+    A = 10
+    x = np.asarray(args[0])
+    return -A * x.shape[0] - np.sum(x**2 - A * np.cos(2*np.pi*x), axis=0)
+
+
+def rosenbrock(args):
+    x = np.asarray(args[0])
+    return -np.sum(100 * (x[1:] - x[:-1]**2)**2 + (1 - x[:-1])**2, axis=0)
+
+
+def ackley(args):
+    x = np.asarray(args[0])
+    ndim = x.shape[0]
+    f = -20 * np.exp(-0.2 * np.sqrt(np.sum(x**2, axis=0) / ndim)) - np.exp(np.sum(np.cos(2*np.pi*x), axis=0) / ndim)
+    return -(f + 20 + np.e)
+
+
+def griewank(args):
+    x = np.asarray(args[0])
+    i = np.arange(1, x.shape[0]+1).reshape([-1] + [1]*(x.ndim-1))
+    return -(1 + np.sum(x**2, axis=0) / 4000 - np.prod(np.cos(x / np.sqrt(i)), axis=0))
+
+
+# name: (function, bound), the domain is [-bound, bound]^ndim
+FUNCTIONS = {"sphere": (sphere, 5.12), "rastrigin": (rastrigin, 5.12), "rosenbrock": (rosenbrock, 2.048),
+             "ackley": (ackley, 32.768), "griewank": (griewank, 600)}
@@ -1,2 +1,15 @@
-from . import logger
-from . import evolve
\ No newline at end of file
+import importlib
+
+# submodules are imported on first access (genalg.evolve, genalg.logger, ...), so that import genalg
+# does not load numpy / matplotlib / multiprocess before they are needed
+
+__all__ = ["logger", "evolve"]
+
+
+def __getattr__(name):
+    try:
+        return importlib.import_module("." + name, __name__)
+    except ModuleNotFoundError as err:
+        if err.name != "%s.%s"%(__name__, name):
+            raise
+        raise AttributeError("module %s has no attribute %s"%(__name__, name)) from None
@@ -0,0 +1,227 @@
+import importlib.util
+import os
+import types
+import numpy as np
+
+
+# Inner math of EA.crossover_pcx / EA.crossover_undx and of the Gaussian / Cauchy mutation
+# The random numbers are drawn by EA and given to the kernels, so both paths follow the same random stream.
+# With numba installed, the loop versions (_xxx_loop) are compiled on their first call (numba is not
+# imported before that, so import genalg stays fast). Otherwise, or with GENALG_NO_JIT=1, the NumPy
+# versions (_xxx_numpy) are used. Both give the same offspring up to rounding.
+
+HAS_NUMBA = importlib.util.find_spec("numba") is not None and os.environ.get("GENALG_NO_JIT", "0") == "0"
+
+# loop functions called inside the kernels, compiled before their callers
+LOOP_HELPERS = ["_gram_schmidt_loop", "_remove_projection_loop"]
+_compiled = {}
+
+
+def compile_loop(fn):
+    # njit fn with the helpers resolved to their compiled versions (nopython mode cannot call Python functions)
+    import numba
+    env = dict(globals())
+    for name in LOOP_HELPERS:
+        if name not in _compiled:
+            _compiled[name] = numba.njit(cache=True)(globals()[name])
+        env[name] = _compiled[name]
+    if fn.__name__ not in _compiled:
+        _compiled[fn.__name__] = numba.njit(cache=True)(types.FunctionType(fn.__code__, env, fn.__name__,
+                                                                           fn.__defaults__, fn.__closure__))
+    return _compiled[fn.__name__]
+
+
+def jit(fn):
+    # compile fn on first call
+    compiled = []
+
+    def wrapper(*args):
+        if len(compiled) == 0:
+            compiled.append(compile_loop(fn))
+        return compiled[0](*args)
+
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+
+# ---------------- loop versions (compiled by numba) ----------------
+
+def _gram_schmidt_loop(arr, basis):
+    # orthonormal columns of arr into basis, a column dependent on the previous ones becomes zero
+    num_params, num_col = arr.shape
+    for n in range(num_col):
+        for k in range(num_params):
+            basis[k, n] = arr[k, n]
+        for i in range(n):
+            dot = 0.0
+            for k in range(num_params):
+                dot += arr[k, n] * basis[k, i]
+            for k in range(num_params):
+                basis[k, n] -= dot * basis[k, i]
+        sz = 0.0
+        for k in range(num_params):
+            sz += basis[k, n]**2
+        sz = np.sqrt(sz)
+        if sz > 1e-12:
+            for k in range(num_params):
+                basis[k, n] /= sz
+        else:
+            for k in range(num_params):
+                basis[k, n] = 0.0
+
+
+def _remove_projection_loop(v, basis, out):
+    # out = v - basis basis^T v
+    num_params, num_col = basis.shape
+    for k in range(num_params):
+        out[k] = v[k]
+    for i in range(num_col):
+        dot = 0.0
+        for k in range(num_params):
+            dot += v[k] * basis[k, i]
+        for k in range(num_params):
+            out[k] -= dot * basis[k, i]
+
+
+def _pcx_loop(x_sel, eta, xi, sgm_eta, sgm_xi):
+    # x_sel: [num_params, mu], the first column is the picked parent
+    num_params, mu = x_sel.shape
+    offspring = np.empty(num_params)
+    tmp = np.empty((num_params, mu))
+    d_norm2 = 0.0
+    for k in range(num_params):
+        g = 0.0
+        for i in range(mu):
+            g += x_sel[k, i]
+        tmp[k, 0] = x_sel[k, 0] - g / mu
+        d_norm2 += tmp[k, 0]**2
+        offspring[k] = x_sel[k, 0]
+    if d_norm2 == 0:
+        return offspring
+
+    # average perpendicular distance of the other parents to d
+    D = 0.0
+    for i in range(1, mu):
+        l = 0.0
+        sz2 = 0.0
+        for k in range(num_params):
+            l += x_sel[k, i] * tmp[k, 0]
+            sz2 += x_sel[k, i]**2
+            tmp[k, i] = x_sel[k, i]
+        D += np.sqrt(max(sz2 - l*l / d_norm2, 0.0))
+    D /= mu - 1
+
+    basis = np.empty((num_params, mu))
+    _gram_schmidt_loop(tmp, basis)
+    for k in range(num_params):
+        s = 0.0
+        for i in range(1, mu):
+            s += basis[k, i] * xi[i-1]
+        offspring[k] += eta * sgm_eta * tmp[k, 0] + D * sgm_xi * s
+    return offspring
+
+
+def _undx_loop(x_sel, x_extra, eta, z, sgm_eta, sgm_xi):
+    # x_sel: [num_params, mu] span V, x_extra gives the distance D, eta: [mu-1], z: [num_params]
+    num_params, mu = x_sel.shape
+    g = np.empty(num_params)
+    d_vec = np.empty((num_params, mu-1))
+    d_norm2 = 0.0
+    for k in range(num_params):
+        s = 0.0
+        for i in range(mu):
+            s += x_sel[k, i]
+        g[k] = s / mu
+        for i in range(mu-1):
+            d_vec[k, i] = x_sel[k, i] - g[k]
+            d_norm2 += d_vec[k, i]**2
+    if np.sqrt(d_norm2) < 1e-5:
+        return g
+
+    basis = np.empty((num_params, mu-1))
+    _gram_schmidt_loop(d_vec, basis)
+    v = np.empty(num_params)
+    for k in range(num_params):
+        v[k] = x_extra[k] - g[k]
+    v_perp = np.empty(num_params)
+    _remove_projection_loop(v, basis, v_perp)
+    D = 0.0
+    for k in range(num_params):
+        D += v_perp[k]**2
+    D = np.sqrt(D)
+
+    z_perp = np.empty(num_params)
+    _remove_projection_loop(z, basis, z_perp)
+    offspring = np.empty(num_params)
+    for k in range(num_params):
+        s = 0.0
+        for i in range(mu-1):
+            s += d_vec[k, i] * eta[i]
+        offspring[k] = g[k] + sgm_eta * s + D * sgm_xi * z_perp[k]
+    return offspring
+
+
+def _perturb_clip_loop(x, step, pmin, pmax):
+    # x + step * (pmax - pmin), clipped to the boundary, in place
+    for k in range(len(x)):
+        y = x[k] + step[k] * (pmax[k] - pmin[k])
+        if y > pmax[k]:
+            y = pmax[k]
+        if y < pmin[k]:
+            y = pmin[k]
+        x[k] = y
+    return x
+
+
+# ---------------- NumPy versions ----------------
+
+def _gram_schmidt_numpy(arr):
+    basis = np.array(arr, dtype=float)
+    for n in range(arr.shape[1]):
+        basis[:, n] -= basis[:, :n] @ (basis[:, :n].T @ arr[:, n])
+        sz = np.sqrt(np.sum(basis[:, n]**2))
+        basis[:, n] = basis[:, n] / sz if sz > 1e-12 else 0
+    return basis
+
+
+def _pcx_numpy(x_sel, eta, xi, sgm_eta, sgm_xi):
+    mu = x_sel.shape[1]
+    x_pick = x_sel[:, 0]
+    d_vec = x_pick - np.mean(x_sel, axis=1)
+    d_norm2 = np.dot(d_vec, d_vec)
+    if d_norm2 == 0:
+        return x_pick.copy()
+
+    x_other = x_sel[:, 1:]
+    l2 = (x_other.T @ d_vec)**2 / d_norm2
+    D = np.mean(np.sqrt(np.maximum(np.sum(x_other**2, axis=0) - l2, 0)))
+
+    basis = _gram_schmidt_numpy(np.concatenate([d_vec[:, None], x_other], axis=1))[:, 1:]
+    return x_pick + eta * sgm_eta * d_vec + D * sgm_xi * (basis @ xi)
+
+
+def _undx_numpy(x_sel, x_extra, eta, z, sgm_eta, sgm_xi):
+    g_vec = np.mean(x_sel, axis=1)
+    d_vec = x_sel[:, :-1] - g_vec[:, None]
+    if np.sqrt(np.sum(d_vec**2)) < 1e-5:
+        return g_vec
+
+    basis = _gram_schmidt_numpy(d_vec)
+    v = x_extra - g_vec
+    D = np.sqrt(np.sum((v - basis @ (basis.T @ v))**2))
+    z_perp = z - basis @ (basis.T @ z)
+    return g_vec + sgm_eta * (d_vec @ eta) + D * sgm_xi * z_perp
+
+
+def _perturb_clip_numpy(x, step, pmin, pmax):
+    return np.clip(x + step * (pmax - pmin), pmin, pmax)
+
+
+if HAS_NUMBA:
+    pcx_offspring = jit(_pcx_loop)
+    undx_offspring = jit(_undx_loop)
+    perturb_clip = jit(_perturb_clip_loop)
+else:
+    pcx_offspring = _pcx_numpy
+    undx_offspring = _undx_numpy
+    perturb_clip = _perturb_clip_numpy
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+# Boundary handling of the offspring, selected per parameter with EA.set_boundary
+# mode (what to do with a gene out of the boundary after crossover):
+#   reject  : redraw the offspring (4 times), then use a uniform random point (as before)
+#   clip    : project to the nearest boundary
+#   reflect : reflect at the boundary (repeatedly, for a gene far outside)
+#   wrap    : periodic boundary, for angles or phases
+# transform (space where crossover and mutation work):
+#   linear  : the parameter itself
+#   log     : log(x), for a parameter spanning orders of magnitude (pmin > 0)
+#   logit   : logit((x-pmin)/(pmax-pmin)), dense near both boundaries. The internal boundary is
+#             logit(LOGIT_EPS) ~ logit(1-LOGIT_EPS)
+# The counts of the last generation are kept in last_record: {"clock", "num_child", "num_draw", "num_out",
+# "num_repaired", "num_rejected", "num_random", "reject_rate", "repair_rate"}, the rates are per crossover draw
+# The history is not kept here, it is in the profiler records (metrics.jsonl) with EA.enable_profiling
+
+MODES = ["reject", "clip", "reflect", "wrap"]
+TRANSFORMS = ["linear", "log", "logit"]
+LOGIT_EPS = 1e-6
+
+
+class Boundary:
+    def __init__(self, pmin, pmax, mode="reject", transform="linear"):
+        self.pmin = np.array(pmin, dtype=float)
+        self.pmax = np.array(pmax, dtype=float)
+        num_params = len(self.pmin)
+        self.mode = get_per_param(mode, num_params, MODES, "Boundary mode")
+        self.transform = get_per_param(transform, num_params, TRANSFORMS, "Transform")
+
+        self.is_log = self.transform == "log"
+        self.is_logit = self.transform == "logit"
+        self.is_linear = not (np.any(self.is_log) or np.any(self.is_logit))
+        if np.any(self.pmin[self.is_log] <= 0):
+            raise ValueError("log transform needs pmin > 0, parameter %s"%(np.where(self.is_log & (self.pmin <= 0))[0]))
+
+        self.lower = np.array(self.to_internal(self.pmin))
+        self.upper = np.array(self.to_internal(self.pmax))
+        self.lower[self.is_logit] = logit(LOGIT_EPS)
+        self.upper[self.is_logit] = logit(1 - LOGIT_EPS)
+
+        self.is_reject = self.mode == "reject"
+        self.is_clip = self.mode == "clip"
+        self.is_reflect = self.mode == "reflect"
+        self.is_wrap = self.mode == "wrap"
+        self.last_record = None
+        self.reset()
+
+    def reset(self):
+        self.num_child = 0
+        self.num_draw = 0
+        self.num_out = 0
+        self.num_repaired = 0
+        self.num_rejected = 0
+        self.num_random = 0
+
+    def to_internal(self, x):
+        # x: [num_params] or [num_params, K]
+        if self.is_linear:
+            return np.asarray(x)
+        u = np.array(x, dtype=float)
+        shape = (-1,) + (1,)*(u.ndim-1)
+        u[self.is_log] = np.log(u[self.is_log])
+        scale = (self.pmax - self.pmin)[self.is_logit].reshape(shape)
+        p = (u[self.is_logit] - self.pmin[self.is_logit].reshape(shape)) / scale
+        u[self.is_logit] = logit(np.clip(p, LOGIT_EPS, 1 - LOGIT_EPS))
+        return u
+
+    def to_external(self, u):
+        if self.is_linear:
+            return u
+        x = np.array(u, dtype=float)
+        shape = (-1,) + (1,)*(x.ndim-1)
+        x[self.is_log] = np.clip(np.exp(x[self.is_log]), self.pmin[self.is_log].reshape(shape),
+                                 self.pmax[self.is_log].reshape(shape))
+        scale = (self.pmax - self.pmin)[self.is_logit].reshape(shape)
+        x[self.is_logit] = self.pmin[self.is_logit].reshape(shape) + scale / (1 + np.exp(-x[self.is_logit]))
+        return x
+
+    def sample(self, rng, num):
+        # uniform in the internal space: [num_params, num]
+        return self.to_external(rng.uniform(self.lower[:, None], self.upper[:, None], (len(self.lower), num)))
+
+    def repair(self, u):
+        """
+        Repair the genes of the clip / reflect / wrap parameters in place (u: [num_params, K], internal space)
+        Returns the columns out of the boundary in a reject parameter
+        """
+        lower, upper = self.lower[:, None], self.upper[:, None]
+        is_out = (u < lower) | (u > upper)
+        is_col_out = np.any(is_out, axis=0)
+        self.num_draw += u.shape[1]
+        self.num_out += np.sum(is_col_out)
+        if not np.any(is_col_out):
+            return np.zeros(u.shape[1], dtype=bool)
+
+        is_fix = is_out & ~self.is_reject[:, None]
+        if np.any(is_fix):
+            width = upper - lower
+            fixed = u.copy()
+            fixed[self.is_clip] = np.clip(u[self.is_clip], lower[self.is_clip], upper[self.is_clip])
+            y = np.mod(u[self.is_reflect] - lower[self.is_reflect], 2*width[self.is_reflect])
+            fixed[self.is_reflect] = lower[self.is_reflect] + np.where(y > width[self.is_reflect],
+                                                                       2*width[self.is_reflect] - y, y)
+            fixed[self.is_wrap] = lower[self.is_wrap] + np.mod(u[self.is_wrap] - lower[self.is_wrap],
+                                                               width[self.is_wrap])
+            u[is_fix] = fixed[is_fix]
+        is_reject = np.any(is_out & self.is_reject[:, None], axis=0)
+        self.num_repaired += np.sum(np.any(is_fix, axis=0) & ~is_reject)
+        self.num_rejected += np.sum(is_reject)
+        return is_reject
+
+    def end_generation(self, clock):
+        num_draw = max(self.num_draw, 1)
+        rec = {"clock": int(clock), "num_child": int(self.num_child), "num_draw": int(self.num_draw),
+               "num_out": int(self.num_out), "num_repaired": int(self.num_repaired),
+               "num_rejected": int(self.num_rejected), "num_random": int(self.num_random),
+               "reject_rate": self.num_rejected / num_draw, "repair_rate": self.num_repaired / num_draw}
+        self.last_record = rec
+        self.reset()
+        return rec
+
+
+def get_per_param(val, num_params, choices, name):
+    # one value for all parameters, or a list of num_params values
+    arr = np.array([val] * num_params if isinstance(val, str) else list(val), dtype=object)
+    if len(arr) != num_params:
+        raise ValueError("%s need to be given for each of %d parameters, given %d"%(name, num_params, len(arr)))
+    for v in arr:
+        if v not in choices:
+            raise ValueError("%s need to be one of %s, selected %s"%(name, choices, v))
+    return arr.astype(str)
+
+
+def logit(p):
+    return np.log(p) - np.log1p(-p)
@@ -0,0 +1,70 @@
+import numpy as np
+import sqlite3
+from collections import OrderedDict
+
+
+class EvalCache:
+    """
+    Fitness cache keyed on quantized parameter vector
+    Two vectors share the key when they are in the same cell of size tol*(pmax-pmin)
+    The least recently used entry is removed when the cache has more than max_size entries,
+    and the results are also kept in sqlite database if path is given
+    """
+    def __init__(self, pmin, pmax, tol=1e-6, max_size=100000, path=None):
+        self.pmin = np.array(pmin, dtype=float)
+        self.scale = (np.array(pmax, dtype=float) - self.pmin) * tol
+        self.scale[self.scale == 0] = tol
+        self.max_size = int(max_size)
+        self.path = path
+        self.data = OrderedDict()
+        self._db = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_db"] = None
+        return state
+
+    def __len__(self):
+        return len(self.data)
+
+    def get_key(self, x):
+        return np.round((np.asarray(x) - self.pmin) / self.scale).astype(np.int64).tobytes()
+
+    def get_db(self):
+        if self._db is None and self.path is not None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS fitness (key BLOB PRIMARY KEY, value REAL)")
+        return self._db
+
+    def get(self, key):
+        if key in self.data:
+            self.data.move_to_end(key)
+            return self.data[key]
+
+        db = self.get_db()
+        if db is not None:
+            row = db.execute("SELECT value FROM fitness WHERE key=?", (key,)).fetchone()
+            if row is not None:
+                self.set(key, row[0], save=False)
+                return row[0]
+        return None
+
+    def set(self, key, value, save=True):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+
+        db = self.get_db()
+        if save and db is not None:
+            db.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?)", (key, value))
+
+    def commit(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class ConvergenceTracker:
+    """
+    Best / mean fitness and diversity of the population for each generation
+    diversity: average standard deviation of the parameters, normalized by (pmax - pmin)
+    The population is stagnant when neither the best nor the mean fitness improved
+    more than tol during the last window generations
+    """
+    def __init__(self, window=20, tol=1e-3, tol_diversity=0):
+        self.window = int(window)
+        self.tol = tol
+        self.tol_diversity = tol_diversity
+        self.best = []
+        self.mean = []
+        self.diversity = []
+        self.start = 0
+
+    def update(self, fit_score, param_vec, pmin, pmax):
+        valid = ~np.isnan(fit_score)
+        if np.any(valid):
+            self.best.append(np.max(fit_score[valid]))
+            self.mean.append(np.mean(fit_score[valid]))
+        else:
+            self.best.append(-np.inf)
+            self.mean.append(-np.inf)
+
+        scale = np.asarray(pmax) - np.asarray(pmin)
+        scale[scale == 0] = 1
+        self.diversity.append(float(np.mean(np.std(param_vec, axis=1) / scale)))
+
+    def reset(self):
+        # start a new window (after restart)
+        self.start = len(self.best)
+
+    def improvement(self):
+        # improvement of best and mean fitness during the last window generations
+        if len(self.best) - self.start <= self.window:
+            return np.inf, np.inf
+        return self.best[-1] - self.best[-self.window-1], self.mean[-1] - self.mean[-self.window-1]
+
+    def is_stagnant(self):
+        d_best, d_mean = self.improvement()
+        return d_best < self.tol and d_mean < self.tol
+
+    def is_collapsed(self):
+        return len(self.diversity) > 0 and self.diversity[-1] <= self.tol_diversity
+
+    def is_improved(self):
+        # best fitness is improved at the last generation
+        return len(self.best) > 1 and self.best[-1] > self.best[-2]
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+# Batched version of EA.crossover_pcx / EA.crossover_undx
+# All offspring of a generation are built at once with stacked numpy operations
+# param_vec: [num_params, num_parent], returns offspring [num_params, num_child]
+# with return_parents, the index of the parents of each offspring [num_child, num_pick] is also returned
+# rng: numpy Generator or genalg.rng.RandomBuffer (np.random module by default)
+
+
+def pick_parents(num_parent, num_child, num_pick, rng=np.random):
+    # pick num_pick distinct parents for each offspring, [num_child, num_pick]
+    # the column order is random, so the first column is a uniform pick among the selected ones
+    keys = rng.random((num_child, num_parent))
+    return np.argsort(keys, axis=1)[:, :num_pick]
+
+
+def crossover_pcx_batch(param_vec, num_child, mu, sgm_eta, sgm_xi, return_parents=False, rng=np.random):
+    num_params, num_parent = param_vec.shape
+    id_select = pick_parents(num_parent, num_child, mu, rng)
+    x_sel = np.transpose(param_vec[:, id_select], (1, 0, 2)) # [num_child, num_params, mu]
+    g_vec = np.mean(x_sel, axis=2)
+
+    # first column is the picked parent
+    x_pick = x_sel[:, :, 0]
+    x_other = x_sel[:, :, 1:]
+    d_vec = x_pick - g_vec
+    d_norm2 = np.sum(d_vec**2, axis=1)
+    is_null = d_norm2 == 0
+    d_norm2[is_null] = 1
+
+    # average perpendicular distance of the other parents to d_vec
+    l = np.einsum("kpm,kp->km", x_other, d_vec) / np.sqrt(d_norm2)[:, None]
+    sz2 = np.sum(x_other**2, axis=1)
+    # mu = 1 (num_params = 2): no other parent, the offspring is the picked parent
+    D = np.mean(np.sqrt(np.maximum(sz2 - l**2, 0)), axis=1) if mu > 1 else np.zeros(num_child)
+
+    # basis perpendicular to d_vec (QR instead of Gram-Schmidt)
+    tmp_vec = np.concatenate([d_vec[:, :, None], x_other], axis=2)
+    basis = np.linalg.qr(tmp_vec)[0][:, :, 1:]
+
+    eta = rng.standard_normal((num_child, 1))
+    xi = rng.standard_normal((num_child, mu-1, 1))
+    offspring = x_pick + eta * sgm_eta * d_vec
+    offspring += (D * sgm_xi)[:, None] * np.squeeze(basis @ xi, axis=2)
+    offspring[is_null] = x_pick[is_null]
+
+    if return_parents:
+        return offspring.T, id_select
+    return offspring.T
+
+
+def crossover_undx_batch(param_vec, num_child, mu, sgm_eta, sgm_xi, return_parents=False, rng=np.random):
+    num_params, num_parent = param_vec.shape
+    # the last pick is not used to span V but gives the distance D
+    id_select = pick_parents(num_parent, num_child, mu+1, rng)
+    x_sel = np.transpose(param_vec[:, id_select[:, :mu]], (1, 0, 2))
+    g_vec = np.mean(x_sel, axis=2)
+    d_vec = x_sel[:, :, :-1] - g_vec[:, :, None] # [num_child, num_params, mu-1]
+    is_null = np.sqrt(np.sum(d_vec**2, axis=(1, 2))) < 1e-5
+
+    # orthonormal basis of V, components orthogonal to V are obtained by projection
+    q = np.linalg.qr(d_vec)[0]
+    v = param_vec[:, id_select[:, mu]].T - g_vec
+    v_perp = v - np.squeeze(q @ (np.transpose(q, (0, 2, 1)) @ v[:, :, None]), axis=2)
+    D = np.sqrt(np.sum(v_perp**2, axis=1))
+
+    eta = rng.standard_normal((num_child, mu-1, 1)) * sgm_eta
+    z = rng.standard_normal((num_child, num_params, 1))
+    z_perp = z - q @ (np.transpose(q, (0, 2, 1)) @ z)
+
+    offspring = g_vec + np.squeeze(d_vec @ eta, axis=2)
+    offspring += (D * sgm_xi)[:, None] * np.squeeze(z_perp, axis=2)
+    offspring[is_null] = g_vec[is_null]
+
+    if return_parents:
+        return offspring.T, id_select
+    return offspring.T
+
@@ -0,0 +1,570 @@
+import numpy as np
+import collections
+import queue
+import threading
+import time
+import os
+from .rng import seed_worker
+
+
+# Evaluation backends used by EA
+# multiprocess is imported when a pool / worker is started, so that import genalg stays light
+# map(fobj, args) returns [fobj(arg) for arg in args]
+# submit(fobj, arg, callback, error_callback) evaluates one arg asynchronously
+# num_workers is the number of jobs that can run at the same time
+# restart() drops the running jobs and starts new workers (used after a timeout, see map_tolerant)
+
+# exit code of a broker worker whose task is cancelled
+EXIT_CANCEL = 3
+
+# fitness of an evaluation that failed (error or timeout after the retries), never selected when
+# enough valid fitness are available (see genalg.selection)
+FAILED = np.nan
+
+
+class SerialEvaluator:
+    num_workers = 1
+
+    def map(self, fobj, args):
+        return [fobj(arg) for arg in args]
+
+    def submit(self, fobj, arg, callback, error_callback):
+        try:
+            res = fobj(arg)
+        except Exception as err:
+            error_callback(err)
+            return
+        callback(res)
+
+    def restart(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PoolEvaluator:
+    """
+    Persistent multiprocess pool, created on first use
+    With shared_memory=True, map_columns writes the parameter sets to a shared-memory block:
+    fobj is sent once to each worker when the pool starts, the tasks only have column ranges,
+    and the workers write the fitness into a shared result array
+    With seed (SeedSequence), the global np.random state of each worker is seeded with its own child stream
+    """
+    def __init__(self, num_process=4, shared_memory=False, seed=None):
+        self.num_workers = num_process
+        self.shared_memory = shared_memory
+        self.seed = seed
+        self._pool = None
+        self._shm = None
+        self._shm_key = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["_shm"] = None
+        return state
+
+    def get_pool(self):
+        if self._pool is None:
+            import multiprocess as mp
+            self._pool = mp.Pool(self.num_workers, initializer=init_worker, initargs=self.get_seed_args())
+        return self._pool
+
+    def get_seed_args(self):
+        if self.seed is None:
+            return (None, None)
+        import multiprocess as mp
+        return (self.seed, mp.Value("l", 0))
+
+    def map(self, fobj, args):
+        return self.get_pool().map(fobj, args)
+
+    def submit(self, fobj, arg, callback, error_callback):
+        self.get_pool().apply_async(fobj, (arg,), callback=callback, error_callback=error_callback)
+
+    def map_columns(self, fobj, params, job_ids, batch=False):
+        # evaluate the columns of params through shared memory, returns fitness and latency of each task
+        num_params, num_col = params.shape
+        if self._shm is None or self._shm_key[0] is not fobj or self._shm_key[1] != batch \
+            or self._shm_key[2] != num_params or self._shm_key[3] < num_col:
+            capacity = num_col if self._shm is None else max(num_col, self._shm_key[3])
+            self.alloc_shared(fobj, batch, num_params, capacity)
+
+        buf_params, buf_ids, buf_fit = get_shared_arrays(self._shm, num_params, self._shm_key[3])
+        buf_params[:, :num_col] = params
+        buf_ids[:num_col] = job_ids
+        buf_fit[:num_col] = np.nan
+
+        if batch:
+            num_chunk = self.num_workers
+        else:
+            num_chunk = min(num_col, 4 * self.num_workers)
+        bounds = np.linspace(0, num_col, num_chunk+1).astype(int)
+        ranges = [(bounds[n], bounds[n+1]) for n in range(num_chunk) if bounds[n] < bounds[n+1]]
+        latency = self._pool.map(run_shared_task, ranges, chunksize=1)
+
+        return buf_fit[:num_col].copy(), [t for lat in latency for t in lat]
+
+    def restart(self):
+        # kill the workers (a hung fobj cannot be interrupted), the pool is created again on next use
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self.close()
+
+    def alloc_shared(self, fobj, batch, num_params, capacity):
+        # workers attach to the blocks once, when the pool starts
+        import multiprocess as mp
+        from multiprocess import shared_memory
+        self.close()
+        self._shm = [shared_memory.SharedMemory(create=True, size=max(1, size)) for size in
+                     [8*num_params*capacity, 8*capacity, 8*capacity]]
+        self._shm_key = (fobj, batch, num_params, capacity)
+        names = [shm.name for shm in self._shm]
+        self._pool = mp.Pool(self.num_workers, initializer=init_shared_worker,
+                             initargs=(fobj, batch, names, num_params, capacity) + self.get_seed_args())
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+        if self._shm is not None:
+            for shm in self._shm:
+                shm.close()
+                shm.unlink()
+            self._shm = None
+            self._shm_key = None
+
+
+# state of the worker attached to the shared memory of PoolEvaluator
+_worker = {}
+
+
+def get_shared_arrays(shm, num_params, capacity):
+    params = np.ndarray((num_params, capacity), dtype=np.float64, buffer=shm[0].buf)
+    job_ids = np.ndarray(capacity, dtype=np.int64, buffer=shm[1].buf)
+    fitness = np.ndarray(capacity, dtype=np.float64, buffer=shm[2].buf)
+    return params, job_ids, fitness
+
+
+def init_worker(seed_seq=None, counter=None):
+    if seed_seq is not None:
+        seed_worker(seed_seq, counter)
+
+
+def init_shared_worker(fobj, batch, names, num_params, capacity, seed_seq=None, counter=None):
+    from multiprocess import shared_memory
+    init_worker(seed_seq, counter)
+    shm = [shared_memory.SharedMemory(name=name) for name in names]
+    _worker["shm"] = shm
+    _worker["fobj"] = fobj
+    _worker["batch"] = batch
+    _worker["arrays"] = get_shared_arrays(shm, num_params, capacity)
+
+
+def run_shared_task(col_range):
+    # evaluate columns n0 <= n < n1 and write the fitness in the shared array
+    n0, n1 = col_range
+    fobj = _worker["fobj"]
+    params, job_ids, fitness = _worker["arrays"]
+    latency = []
+    if _worker["batch"]:
+        t0 = time.perf_counter()
+        fitness[n0:n1] = fobj([params[:, n0:n1].copy(), job_ids[n0:n1].copy()])
+        latency.append(time.perf_counter() - t0)
+    else:
+        for n in range(n0, n1):
+            t0 = time.perf_counter()
+            fitness[n] = fobj([params[:, n].copy(), int(job_ids[n])])
+            latency.append(time.perf_counter() - t0)
+    return latency
+
+
+def new_fault_stats():
+    return {"error": 0, "timeout": 0, "retry": 0, "failed": 0, "restart": 0}
+
+
+def map_tolerant(evaluator, fobj, args, timeout=None, max_retry=0, stats=None):
+    """
+    map that does not stop on a bad evaluation
+    - an evaluation raising an error, or running more than timeout sec, is submitted again up to max_retry times
+      and gets None after that
+    - after a timeout the workers are restarted, the other running evaluations are submitted again
+      (not counted as retry)
+    At most num_workers evaluations are submitted at once, so the time is measured from the start of each one.
+    The timeout needs workers in other processes (PoolEvaluator / BrokerEvaluator)
+    Returns the results and the latency of each successful evaluation, the counts are added to stats
+    """
+    if stats is None:
+        stats = new_fault_stats()
+    if hasattr(evaluator, "task_timeout"):
+        # the broker workers stop the heartbeat of a task running longer than timeout
+        evaluator.task_timeout = timeout
+    done = queue.Queue()
+    res = [None] * len(args)
+    attempt = [0] * len(args)
+    todo = collections.deque(range(len(args)))
+    running = {} # index: (submit id, start time)
+    latency = []
+    num_submit = 0
+    num_done = 0
+
+    def submit(n, sid):
+        evaluator.submit(fobj, args[n], callback=lambda val: done.put((n, sid, val, None)),
+                         error_callback=lambda err: done.put((n, sid, None, err)))
+
+    def retry(n, kind):
+        # returns True when n is finished (failed)
+        stats[kind] += 1
+        if attempt[n] < max_retry:
+            attempt[n] += 1
+            stats["retry"] += 1
+            todo.appendleft(n)
+            return False
+        stats["failed"] += 1
+        return True
+
+    while num_done < len(args):
+        while len(todo) > 0 and len(running) < evaluator.num_workers:
+            n = todo.popleft()
+            running[n] = (num_submit, time.perf_counter())
+            num_submit += 1
+            submit(n, running[n][0])
+
+        wait = None
+        if timeout is not None:
+            wait = max(0, min(t0 for _, t0 in running.values()) + timeout - time.perf_counter())
+        try:
+            n, sid, val, err = done.get(timeout=wait)
+        except queue.Empty:
+            now = time.perf_counter()
+            for n, (_, t0) in list(running.items()):
+                del running[n]
+                if now - t0 >= timeout:
+                    num_done += retry(n, "timeout")
+                else:
+                    todo.appendleft(n)
+            evaluator.restart()
+            stats["restart"] += 1
+            continue
+
+        if n not in running or running[n][0] != sid:
+            # result of a submission dropped by timeout
+            continue
+        t0 = running.pop(n)[1]
+        if err is None:
+            res[n] = val
+            latency.append(time.perf_counter() - t0)
+            num_done += 1
+        else:
+            num_done += retry(n, "error")
+
+    return res, latency
+
+
+class BrokerEvaluator:
+    """
+    Broker sending (task id, arg) over TCP socket to standalone workers (see run_worker)
+    The object function is not sent: each worker runs its own fobj, arg = [param vector, job_id]
+    so the latency of each task (from sending it to the result) is measured here, see pop_latency
+    - max_pending: submit blocks when this number of tasks is waiting or running (backpressure)
+    - timeout: a worker that sends neither heartbeat nor result for timeout sec is dropped,
+      and its task is queued again
+    - task_timeout: a worker sends heartbeats for task_timeout sec at most (set by map_tolerant)
+    restart() drops the queued and running tasks. The workers running them exit (a hung fobj cannot be
+    interrupted), the local workers are started again and standalone workers are restarted by main
+    """
+    def __init__(self, host="127.0.0.1", port=0, authkey=b"genalg", num_workers=4, max_pending=None, timeout=30):
+        self.num_workers = num_workers
+        self.authkey = authkey
+        self.timeout = timeout
+        if max_pending is None:
+            max_pending = 4 * num_workers
+        self._slots = threading.Semaphore(max_pending)
+        self._tasks = collections.deque()
+        self._cond = threading.Condition()
+        self._callbacks = {}
+        self._task_id = 0
+        self._closed = False
+        self._local_workers = []
+        self._local_fobj = None
+        self._running = {} # task id: (connection, worker pid)
+        self.task_timeout = None
+        self._latency = collections.deque(maxlen=1<<16)
+        self.num_requeue = 0
+
+        from multiprocessing.connection import Listener
+        self._listener = Listener((host, port), authkey=authkey)
+        self.address = self._listener.address
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self._accept_thread.start()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _pop_task(self):
+        with self._cond:
+            while len(self._tasks) == 0 and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            return self._tasks.popleft()
+
+    def _requeue(self, task):
+        with self._cond:
+            self._tasks.appendleft(task)
+            self.num_requeue += 1
+            self._cond.notify()
+
+    def _serve(self, conn):
+        # one thread for each worker, the worker gets the next task after returning the result
+        try:
+            pid = conn.recv()[1]
+        except (OSError, EOFError):
+            conn.close()
+            return
+
+        while True:
+            task = self._pop_task()
+            if task is None:
+                try:
+                    conn.send(("stop",))
+                except OSError:
+                    pass
+                conn.close()
+                return
+
+            task_id, arg = task
+            with self._cond:
+                self._running[task_id] = (conn, pid)
+            try:
+                t0 = time.perf_counter()
+                conn.send(("task", task_id, arg, self.task_timeout))
+                while True:
+                    if not conn.poll(self.timeout):
+                        raise TimeoutError("worker does not respond")
+                    msg = conn.recv()
+                    if msg[0] != "heartbeat":
+                        break
+            except (OSError, EOFError, TimeoutError):
+                # lost worker, the task is queued again unless it is dropped by restart
+                with self._cond:
+                    self._running.pop(task_id, None)
+                    is_dropped = task_id not in self._callbacks
+                if not is_dropped:
+                    self._requeue(task)
+                conn.close()
+                return
+
+            with self._cond:
+                self._running.pop(task_id, None)
+                callbacks = self._callbacks.pop(task_id, None)
+                if callbacks is not None:
+                    self._latency.append(time.perf_counter() - t0)
+            if callbacks is None:
+                # dropped by restart, the late result is ignored
+                continue
+            callback, error_callback = callbacks
+            self._slots.release()
+            if msg[0] == "result":
+                callback(msg[2])
+            else:
+                error_callback(RuntimeError("Worker failed on task %d: %s"%(task_id, msg[2])))
+
+    def submit(self, fobj, arg, callback, error_callback):
+        self._slots.acquire()
+        with self._cond:
+            task_id = self._task_id
+            self._task_id += 1
+            self._callbacks[task_id] = (callback, error_callback)
+            self._tasks.append((task_id, arg))
+            self._cond.notify()
+
+    def map(self, fobj, args):
+        res = [None] * len(args)
+        err = []
+        done = threading.Semaphore(0)
+
+        def set_result(n):
+            def callback(val):
+                res[n] = val
+                done.release()
+            return callback
+
+        def set_error(e):
+            err.append(e)
+            done.release()
+
+        for n, arg in enumerate(args):
+            self.submit(fobj, arg, set_result(n), set_error)
+        for n in range(len(args)):
+            done.acquire()
+
+        if len(err) > 0:
+            raise err[0]
+        return res
+
+    def pop_latency(self):
+        # latency of the tasks finished since the last call
+        with self._cond:
+            latency = list(self._latency)
+            self._latency.clear()
+        return latency
+
+    def restart(self):
+        # drop the queued and running tasks, and stop the workers running them
+        with self._cond:
+            num_drop = len(self._callbacks)
+            self._callbacks.clear()
+            self._tasks.clear()
+            running = list(self._running.items())
+            self._running.clear()
+        for n in range(num_drop):
+            self._slots.release()
+
+        pids = []
+        for task_id, (conn, pid) in running:
+            try:
+                conn.send(("cancel", task_id))
+            except OSError:
+                pass
+            pids.append(pid)
+
+        # replace the local workers that exit
+        for n, p in enumerate(self._local_workers):
+            if p.pid not in pids:
+                continue
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+            self._local_workers[n] = self._start_local_worker()
+
+    def start_local_workers(self, fobj, num_workers=None):
+        # run workers on localhost as separate processes
+        if num_workers is None:
+            num_workers = self.num_workers
+        self._local_fobj = fobj
+        for n in range(num_workers):
+            self._local_workers.append(self._start_local_worker())
+
+    def _start_local_worker(self):
+        import multiprocess as mp
+        p = mp.Process(target=run_worker, args=(self.address, self._local_fobj, self.authkey), daemon=True)
+        p.start()
+        return p
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._listener.close()
+        for p in self._local_workers:
+            p.join(timeout=self.timeout)
+            if p.is_alive():
+                p.terminate()
+        self._local_workers = []
+
+
+def run_worker(address, fobj, authkey=b"genalg", heartbeat=1.0):
+    """
+    Worker for BrokerEvaluator: pull tasks, run fobj and send back the result
+    A heartbeat is sent every heartbeat sec while fobj is running, up to the task timeout of the broker.
+    The process exits with EXIT_CANCEL when the broker cancels the running task (see BrokerEvaluator.restart)
+    """
+    from multiprocessing.connection import Client
+    conn = Client(tuple(address), authkey=authkey)
+    conn.send(("hello", os.getpid()))
+    lock = threading.Lock()
+    stop = threading.Event()
+    current = {} # task id, start time and timeout of the running task
+
+    def watch():
+        # the main thread does not read the connection while fobj is running
+        t_beat = time.perf_counter()
+        while not stop.wait(min(heartbeat, 0.1)):
+            with lock:
+                if len(current) == 0:
+                    continue
+                if conn.poll(0):
+                    msg = conn.recv()
+                    if msg[0] == "cancel" and msg[1] == current["task_id"]:
+                        os._exit(EXIT_CANCEL)
+                now = time.perf_counter()
+                if current["timeout"] is not None and now - current["t0"] > current["timeout"]:
+                    continue
+                if now - t_beat >= heartbeat:
+                    conn.send(("heartbeat",))
+                    t_beat = now
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            if msg[0] == "stop":
+                break
+            if msg[0] == "cancel":
+                # the result is already sent
+                continue
+
+            _, task_id, arg, timeout = msg
+            with lock:
+                current.update(task_id=task_id, t0=time.perf_counter(), timeout=timeout)
+            try:
+                out = ("result", task_id, fobj(arg))
+            except Exception as err:
+                out = ("error", task_id, repr(err))
+            with lock:
+                current.clear()
+                conn.send(out)
+    finally:
+        stop.set()
+        conn.close()
+
+
+def supervise_worker(address, fobj, authkey=b"genalg", heartbeat=1.0):
+    # run_worker in a child process, started again when its task is cancelled
+    import multiprocess as mp
+    while True:
+        p = mp.Process(target=run_worker, args=(address, fobj, authkey, heartbeat))
+        p.start()
+        p.join()
+        if p.exitcode != EXIT_CANCEL:
+            return p.exitcode
+
+
+def main():
+    # python -m genalg.evaluator --host HOST --port PORT --fobj module:function
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description="genalg evaluation worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--authkey", default="genalg")
+    parser.add_argument("--fobj", required=True, help="object function, module:function")
+    parser.add_argument("--heartbeat", type=float, default=1.0)
+    args = parser.parse_args()
+
+    module, name = args.fobj.split(":")
+    fobj = getattr(importlib.import_module(module), name)
+    print("worker %d connects to %s:%d"%(os.getpid(), args.host, args.port))
+    supervise_worker((args.host, args.port), fobj, args.authkey.encode(), args.heartbeat)
+
+
+if __name__ == "__main__":
+    main()
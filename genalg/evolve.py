@@ -1,13 +1,33 @@
-from re import S
 import numpy as np
-import multiprocess as mp
-from scipy.linalg import null_space
+import queue
+import time
 import os
 import pickle as pkl
+from .history import HistoryWriter, copy_history, is_history, read_meta, truncate_history
+from .cache import EvalCache
+from .crossover import crossover_pcx_batch, crossover_undx_batch
+from .evaluator import SerialEvaluator, PoolEvaluator, BrokerEvaluator, run_worker, map_tolerant, new_fault_stats, FAILED
+from .profiler import Profiler, TimedCall, NULL_PHASE
+from .selection import select, STRATEGIES
+from .convergence import ConvergenceTracker
+from .surrogate import SURROGATES
+from .lineage import Lineage
+from .rng import RandomBuffer, get_seed_seq, job_rng
+from .mutation import MUTATIONS, mutate
+from ._kernels import pcx_offspring, undx_offspring
+from .boundary import Boundary
+from .pareto import select_nsga2, non_dominated_sort
+
+
+# attributes saved in checkpoint to restore the setting of EA
+CHECKPOINT_CONFIG = ["num_params", "num_parent", "num_offspring", "num_select", "mu", "sgm_eta", "sgm_xi",
+                     "pmin", "pmax", "do_mutate", "crossover_type", "batch_crossover", "log_format",
+                     "selection", "mutation", "mutation_rate", "boundary_mode", "boundary_transform",
+                     "num_objectives"]
 
 
 class EA:
-    def __init__(self, num_params, log_dir="./log", mu=2, num_select=2, num_offspring=5, num_parent=10, use_multiprocess=False, num_overlap=1, num_process=4, do_mutate=True, crossover_type="pcx"):
+    def __init__(self, num_params, log_dir="./log", mu=2, num_select=2, num_offspring=5, num_parent=10, use_multiprocess=False, num_overlap=1, num_process=4, do_mutate=True, crossover_type="pcx", batch_crossover=False, log_format="text", log_flush_every=10, selection="roulette", use_shared_memory=False, seed=None, mutation="gaussian", mutation_rate=None, num_objectives=1):
         self.num_parent = int(num_parent)
         self.num_offspring = int(num_offspring)
         self.num_params = int(num_params)
@@ -15,6 +35,7 @@ class EA:
         self.pmax = None
         self.log_dir = log_dir
         self.use_multiprocess = use_multiprocess
+        self.use_shared_memory = use_shared_memory
         self.job_id = 0
         self.clock = 0
         self.num_process = num_process
@@ -24,19 +45,212 @@ class EA:
         self.mu = mu
         self.param_vec = np.zeros([self.num_params, self.num_parent])
         self.fit_score = np.zeros([self.num_parent])
+        # multi-objective mode (num_objectives > 1): fobj returns a vector, every objective is maximized
+        # the objectives of the parents are kept in self.objectives [num_parent, num_objectives], and fit_score is
+        # -(Pareto rank) among the parents (0 for the non-dominated front), see genalg.pareto
+        self.num_objectives = int(num_objectives)
+        self.objectives = np.zeros([self.num_parent, self.num_objectives]) if self.num_objectives > 1 else None
         self.fobj = None
+        self.batch_fobj = False
         self.parent_id = np.ones(self.num_parent) * (-1)
-        self.offspring_id = []
         # A Functional Specialization Hypothesis for Designing Genetic Algorithms 
         self.sgm_eta = 1/np.sqrt(self.mu)
         self.sgm_xi  = 0.35/np.sqrt(self.num_parent - self.mu)
         self.do_mutate = do_mutate
+        # probability of each gene to mutate, see genalg.mutation
+        self.mutation = mutation
+        self.mutation_rate = 0.01/self.num_params if mutation_rate is None else mutation_rate
+        self.mutation_op = None
+        # boundary handling of the offspring for each parameter, see genalg.boundary
+        self.boundary_mode = "reject"
+        self.boundary_transform = "linear"
+        self.boundary = None
         self.crossover_type = crossover_type
-
-    def set_object_func(self, f):
+        self.batch_crossover = batch_crossover
+        self.log_format = log_format
+        self.selection = selection
+        self.log_flush_every = log_flush_every
+        self._evaluator = None
+        self._own_evaluator = False
+        self._history = None
+        self.cache = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.num_eval = 0
+        self.surrogate = None
+        self.oversample = 1
+        self.convergence = None
+        self.num_restart = 0
+        self.profiler = None
+        self.fault_tolerant = False
+        self.eval_timeout = None
+        self.max_retry = 0
+        self.fault_stats = new_fault_stats()
+        self.on_generation_end = None
+        self.on_evaluation = None
+        self.lineage = None
+        self.lineage_origin = 0
+        # lineage node of each parent slot, and of the crossover parents of the last offspring
+        self.slot_node = np.ones(self.num_parent, dtype=np.int64) * (-1)
+        self.parent_nodes = None
+        self.offspring_parents = None
+        self.offspring_mutated = None
+        self._last_parents = []
+        self.set_seed(seed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        # worker pool cannot be pickled (fobj can be a bound method of EA)
+        state = self.__dict__.copy()
+        state["_evaluator"] = None
+        state["_history"] = None
+        state["cache"] = None
+        state["lineage"] = None
+        return state
+
+    def set_seed(self, seed=None):
+        # random stream of EA (int, SeedSequence or None), see genalg.rng
+        # None follows the global np.random state, so np.random.seed(n) before creating EA fixes the run
+        self.rng = RandomBuffer(get_seed_seq(seed))
+
+    def get_job_rng(self, job_id):
+        # Generator for a stochastic object function, same stream for the job id in serial and parallel runs
+        return job_rng(self.rng.seed_seq, job_id)
+
+    def set_evaluator(self, evaluator):
+        # evaluation backend, see genalg.evaluator (SerialEvaluator, PoolEvaluator, BrokerEvaluator)
+        # the evaluator set by user is not closed by EA
+        self.close_evaluator()
+        self._evaluator = evaluator
+        self._own_evaluator = False
+
+    def get_evaluator(self):
+        # default backend is selected by use_multiprocess, and created on first use
+        # the worker pool is reused for every generation
+        if self._evaluator is None:
+            if self.use_multiprocess:
+                self._evaluator = PoolEvaluator(self.num_process, shared_memory=self.use_shared_memory,
+                                                seed=self.rng.seed_seq.spawn(1)[0])
+            else:
+                self._evaluator = SerialEvaluator()
+            self._own_evaluator = True
+        return self._evaluator
+
+    def close(self):
+        self.close_evaluator()
+        self.close_history()
+        if self.lineage is not None:
+            self.lineage.flush()
+        if self.cache is not None:
+            self.cache.close()
+
+    def close_evaluator(self):
+        if self._evaluator is not None and self._own_evaluator:
+            self._evaluator.close()
+            self._evaluator = None
+
+    def close_history(self):
+        # flush the buffered binary log
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+
+    def set_object_func(self, f, batch=False):
         # object function need to return float (fitness)
         # res = f([arr, job_id])
+        # batch object function evaluates several parameter sets at once
+        # res = f([arr_2d, job_ids]) with arr_2d [num_params, K], and returns K fitness values
         self.fobj = f 
+        self.batch_fobj = batch
+
+    def set_cache(self, tol=1e-6, max_size=100000, path=None):
+        # reuse the fitness of (nearly) same parameter vector, need to be called after set_min_max
+        # tol is relative to pmax-pmin, results are also saved in sqlite file if path is given
+        if self.pmin is None or self.pmax is None:
+            raise AttributeError("Boundary is not defined: call set_min_max")
+        self.cache = EvalCache(self.pmin, self.pmax, tol=tol, max_size=max_size, path=path)
+
+    def set_callback(self, on_generation_end=None, on_evaluation=None):
+        # on_generation_end(ea, record): called at the end of each generation, record is None without profiling
+        # on_evaluation(job_id, arr, fitness): called for each evaluated parameter set
+        self.on_generation_end = on_generation_end
+        self.on_evaluation = on_evaluation
+
+    def set_fault_tolerance(self, timeout=None, max_retry=1):
+        # an evaluation that raises or runs more than timeout sec is retried max_retry times,
+        # and gets FAILED (NaN) fitness after that instead of stopping the run, see evaluator.map_tolerant
+        # the counts are kept in self.fault_stats (and "failed" of the profiler records)
+        self.fault_tolerant = True
+        self.eval_timeout = timeout
+        self.max_retry = int(max_retry)
+
+    def enable_profiling(self):
+        # per-phase timing, evaluation latency and bytes written, see genalg.profiler
+        # the records are written to log_dir/metrics.jsonl by print_log
+        self.profiler = Profiler()
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    def phase(self, name):
+        if self.profiler is None:
+            return NULL_PHASE
+        return self.profiler.phase(name)
+
+    def end_generation(self):
+        rec = None
+        if self.profiler is not None:
+            rec = self.profiler.end_generation(self.clock)
+        if self.boundary is not None:
+            rec_boundary = self.boundary.end_generation(self.clock)
+            if rec is not None:
+                rec["boundary"] = rec_boundary
+        if self.on_generation_end is not None:
+            self.on_generation_end(self, rec)
+
+    def set_surrogate(self, kind="knn", oversample=4, **kwargs):
+        # pre-screen oversample*num_offspring candidates with a cheap model (see genalg.surrogate),
+        # and evaluate only the best num_offspring of them. need to be called after set_min_max
+        if self.pmin is None or self.pmax is None:
+            raise AttributeError("Boundary is not defined: call set_min_max")
+        if kind not in SURROGATES:
+            raise ValueError("Surrogate need to be one of %s, selected %s"%(list(SURROGATES), kind))
+        self.surrogate = SURROGATES[kind](self.pmin, self.pmax, **kwargs)
+        self.oversample = int(oversample)
+
+    def enable_lineage(self, keep_params=False, origin=0):
+        # record the crossover parents of every evaluated job, see genalg.lineage
+        # origin tags the roots of this population (island id), keep_params saves the parameters of every job
+        self.lineage = Lineage(self.mu+1, self.num_params, log_dir=self.log_dir, keep_params=keep_params)
+        self.lineage_origin = origin
+
+    def record_roots(self, id_slot, job_ids, origin=None):
+        # parents without crossover parents (initialization, restart, migrants)
+        if self.lineage is None:
+            return
+        if origin is None:
+            origin = self.lineage_origin
+        self.slot_node[id_slot] = self.lineage.append(job_ids, self.clock, None, self.fit_score[id_slot],
+                                                      self.param_vec[:, id_slot], origin)
+
+    def set_mutation(self, kind="gaussian", rate=None, **kwargs):
+        # mutation operator (gaussian, polynomial, cauchy, adaptive) and its parameters, see genalg.mutation
+        if kind not in MUTATIONS:
+            raise ValueError("Mutation need to be one of %s, selected %s"%(list(MUTATIONS), kind))
+        self.mutation = kind
+        self.mutation_op = MUTATIONS[kind](**kwargs)
+        if rate is not None:
+            self.mutation_rate = rate
+
+    def get_mutation(self):
+        if self.mutation_op is None:
+            self.mutation_op = MUTATIONS[self.mutation]()
+        return self.mutation_op
 
     def set_min_max(self, pmin, pmax):
         if (len(pmin) != self.num_params) or (len(pmin) != self.num_params):
@@ -45,6 +259,22 @@ class EA:
 
         self.pmin = np.array(pmin)
         self.pmax = np.array(pmax)
+        self.boundary = None
+
+    def set_boundary(self, mode="reject", transform="linear"):
+        # mode and transform: one for all parameters or a list for each parameter, see genalg.boundary
+        # crossover and mutation work in the transformed space, the repair / reject rate of each generation
+        # is in "boundary" of the profiler records (self.boundary.last_record keeps the last one)
+        self.boundary_mode = mode
+        self.boundary_transform = transform
+        self.boundary = None
+        if self.pmin is not None and self.pmax is not None:
+            self.get_boundary()
+
+    def get_boundary(self):
+        if self.boundary is None:
+            self.boundary = Boundary(self.pmin, self.pmax, self.boundary_mode, self.boundary_transform)
+        return self.boundary
 
     def check_setting(self):
         if self.num_parent < self.num_offspring:
@@ -65,238 +295,543 @@ class EA:
         if self.crossover_type not in ["pcx", "undx"]:
             raise ValueError("Crossover type need need to be pcx or undx, selected %s"%(self.crossover_type))
 
-    def run(self, max_iter=100, tol=1e-3, auto_init=True):
-        job_id = 0
-        ncycle = 0
-        dscore = 0
+        if self.selection not in STRATEGIES:
+            raise ValueError("Selection need to be one of %s, selected %s"%(list(STRATEGIES), self.selection))
+
+        if self.mutation not in MUTATIONS:
+            raise ValueError("Mutation need to be one of %s, selected %s"%(list(MUTATIONS), self.mutation))
+
+        if self.log_format not in ["text", "binary"]:
+            raise ValueError("Log format need to be text or binary, selected %s"%(self.log_format))
+
+        if self.num_objectives < 1:
+            raise ValueError("num_objectives need to be >= 1, given %d"%(self.num_objectives))
+
+        if self.num_objectives > 1 and (self.cache is not None or self.surrogate is not None or self.use_shared_memory):
+            raise ValueError("Cache, surrogate and shared memory evaluation support single objective only")
 
+        self.get_boundary()
+
+    def run(self, max_iter=100, tol=1e-3, auto_init=True, checkpoint_every=None, window=None, tol_diversity=0,
+            max_restart=0, num_elite=1, adapt_offspring=False):
+        """
+        checkpoint_every: save checkpoint (save_checkpoint) every checkpoint_every generations
+        window: stop when best and mean fitness do not improve more than tol during window generations,
+                or the diversity of population (see genalg.convergence) is under tol_diversity
+        max_restart: instead of stopping, re-randomize the parents except the best num_elite up to max_restart times
+        adapt_offspring: increase num_offspring while the best fitness improves, and decrease it otherwise
+        The reason of stop is kept in self.stop_reason
+        With auto_init=False, the convergence history and the number of restarts are continued
+        (also after load_checkpoint)
+        """
         # check setting
         self.check_setting()
+        if auto_init or self.convergence is None:
+            self.convergence = ConvergenceTracker(window if window is not None else 1, tol, tol_diversity)
+            self.num_restart = 0
+        else:
+            self.convergence.window = int(window) if window is not None else 1
+            self.convergence.tol = tol
+            self.convergence.tol_diversity = tol_diversity
+        self.stop_reason = "max_iter"
+
+        own_evaluator = self._evaluator is None
+        own_history = self._history is None
+        self.get_evaluator()
+
+        try:
+            if auto_init:
+                self.random_initialization()
+
+            for n in range(int(max_iter)):
+                self.next_generation()
+                self.print_log()
+
+                self.convergence.update(self.fit_score, self.param_vec, self.pmin, self.pmax)
+                if adapt_offspring:
+                    self.adapt_offspring()
+
+                is_stop = False
+                if window is not None and (self.convergence.is_stagnant() or self.convergence.is_collapsed()):
+                    if self.num_restart < max_restart:
+                        self.restart_population(num_elite)
+                        self.convergence.reset()
+                        self.num_restart += 1
+                    else:
+                        self.stop_reason = "stagnant" if self.convergence.is_stagnant() else "collapsed"
+                        is_stop = True
 
-        if auto_init:
-            self.random_initialization()
-
-        for n in range(int(max_iter)):
-            self.next_generation()
-            self.print_log()
+                # saved at the end of the generation, so the resumed run continues from the same state
+                if checkpoint_every is not None and self.clock % checkpoint_every == 0:
+                    self.save_checkpoint()
+                if is_stop:
+                    break
+        finally:
+            if own_evaluator:
+                self.close_evaluator()
+            if own_history:
+                self.close_history()
+
+    def restart_population(self, num_elite=1):
+        # re-randomize the parents except the best num_elite
+        scores = np.where(np.isnan(self.fit_score), -np.inf, self.fit_score)
+        id_reset = np.argsort(scores)[::-1][num_elite:]
+        self.param_vec[:, id_reset] = self.get_boundary().sample(self.rng, len(id_reset))
+        job_ids = self.count_jobs(len(id_reset))
+        self.set_fitness(id_reset, self.evaluate(self.param_vec[:, id_reset], job_ids))
+        self.parent_id[id_reset] = -1
+        self.record_roots(id_reset, job_ids)
+
+    def adapt_offspring(self, rate=1.1):
+        # more offspring while the best improves, fewer when it does not (less evaluations in the slow phase)
+        if self.convergence.is_improved():
+            num_offspring = int(np.ceil(self.num_offspring * rate))
+        else:
+            num_offspring = int(self.num_offspring / rate)
+        self.num_offspring = int(np.clip(num_offspring, self.num_select, self.num_parent))
 
     def random_initialization(self):
-        # all parent have id as -1
-        for n in range(self.num_parent):
-            self.param_vec[:, n] = np.random.uniform(self.pmin, self.pmax)
+        self.sample_population()
         self.eval_initialization()
 
+    def sample_population(self):
+        # all parent have id as -1
+        self.param_vec = self.get_boundary().sample(self.rng, self.num_parent)
+
     def eval_initialization(self):
-        if self.use_multiprocess:
-            args = []
-            for n in range(self.num_parent):
-                args.append([self.param_vec[:,n], self.job_id])
-                self.count_job()
+        job_ids = self.count_jobs(self.num_parent)
+        self.fit_score = np.zeros(self.num_parent)
+        self.set_fitness(np.arange(self.num_parent), self.evaluate(self.param_vec, job_ids))
+        self.record_roots(np.arange(self.num_parent), job_ids)
+        self.reset_job_id()
 
-            self.fit_score = []
-            flag = False
-            n_set = self.num_parent // self.num_process
-            if self.num_parent % self.num_process != 0:
-                flag = True
-                n_set += 1
-
-            for n in range(n_set):
-                n0 = self.num_process * n
-                with mp.Pool(self.num_process) as p:
-                    if flag and (n == n_set-1):
-                        args_tmp = args[n0:]
-                    else:
-                        args_tmp = args[n0:n0+self.num_process]
+    def set_fitness(self, id_slot, fitness):
+        # fitness of the parent slots, the Pareto rank of all parents is updated in multi-objective mode
+        if self.num_objectives == 1:
+            self.fit_score[id_slot] = fitness
+            return
+        self.objectives[id_slot] = fitness
+        self.fit_score = -non_dominated_sort(self.objectives).astype(float)
+
+    def get_failed(self):
+        # fitness of a failed evaluation
+        if self.num_objectives == 1:
+            return FAILED
+        return np.full(self.num_objectives, FAILED)
+
+    def evaluate(self, params, job_ids):
+        # evaluate each column of params, res = fobj([params[:,n], job_ids[n]])
+        if self.cache is None:
+            fitness = self._evaluate(params, job_ids)
+        else:
+            fitness = self._evaluate_cache(params, job_ids)
+        if self.num_objectives > 1:
+            # [num_job, num_objectives]
+            fitness = np.array([self.get_failed() if np.ndim(f) == 0 else f for f in fitness],
+                               dtype=float).reshape(-1, self.num_objectives)
+        self.record_evaluations(params, fitness, job_ids)
+        return fitness
+
+    def record_evaluations(self, params, fitness, job_ids):
+        # count, surrogate data and callback of evaluations, also for the fitness given from outside (genalg.sweep)
+        self.num_eval += len(job_ids)
+        if self.surrogate is not None:
+            self.surrogate.update(params, fitness)
+        if self.on_evaluation is not None:
+            for n in range(len(job_ids)):
+                self.on_evaluation(job_ids[n], params[:, n], fitness[n])
+
+    def _evaluate_cache(self, params, job_ids):
+        fitness = np.zeros(len(job_ids))
+        keys = [self.cache.get_key(params[:, n]) for n in range(len(job_ids))]
+        id_miss = {} # key: index to evaluate, duplicated vectors are evaluated once
+        id_dup = []
+        for n, key in enumerate(keys):
+            val = self.cache.get(key)
+            if val is not None:
+                fitness[n] = val
+                self.cache_hits += 1
+            elif key in id_miss:
+                id_dup.append(n)
+                self.cache_hits += 1
+            else:
+                id_miss[key] = n
+                self.cache_misses += 1
+
+        id_eval = list(id_miss.values())
+        if len(id_eval) > 0:
+            fitness[id_eval] = self._evaluate(params[:, id_eval], [job_ids[n] for n in id_eval])
+            for n in id_eval:
+                if not np.isnan(fitness[n]):
+                    self.cache.set(keys[n], fitness[n])
+            self.cache.commit()
+
+        for n in id_dup:
+            fitness[n] = fitness[id_miss[keys[n]]]
+
+        return fitness
+
+    def _evaluate(self, params, job_ids):
+        evaluator = self.get_evaluator()
+        if getattr(evaluator, "shared_memory", False) and not self.fault_tolerant:
+            # only column index is sent to the workers
+            t0 = time.perf_counter()
+            fitness, latency = evaluator.map_columns(self.fobj, params, job_ids, self.batch_fobj)
+            if self.profiler is not None:
+                self.profiler.add_evaluation(latency, time.perf_counter()-t0, evaluator.num_workers)
+            return fitness
+
+        if self.batch_fobj:
+            # split the batch into one sub-batch for each worker
+            job_ids = np.asarray(job_ids)
+            id_split = np.array_split(np.arange(len(job_ids)), evaluator.num_workers)
+            args = [[params[:, ids], job_ids[ids]] for ids in id_split if len(ids) > 0]
+        else:
+            args = [[params[:, n], job_ids[n]] for n in range(len(job_ids))]
+
+        if self.fault_tolerant:
+            return self._evaluate_tolerant(evaluator, args)
 
-                    tmp_fit = p.map(self.fobj, args_tmp)
-                    self.fit_score.extend(tmp_fit)
+        # dispatch all jobs at once
+        if self.profiler is None:
+            res = evaluator.map(self.fobj, args)
         else:
-            self.fit_score = []
-            for n in range(self.num_parent):
-                self.fit_score.append(self.fobj([self.param_vec[:,n], self.job_id]))
-                self.count_job()
-        
-        self.fit_score = np.array(self.fit_score)
-        self.reset_job_id()
+            t0 = time.perf_counter()
+            if hasattr(evaluator, "pop_latency"):
+                # the workers run their own fobj (BrokerEvaluator), the evaluator measures the latency
+                evaluator.pop_latency()
+                res = evaluator.map(self.fobj, args)
+                latency = evaluator.pop_latency()
+            else:
+                res = evaluator.map(TimedCall(self.fobj), args)
+                res, latency = zip(*res)
+            self.profiler.add_evaluation(latency, time.perf_counter()-t0, evaluator.num_workers)
+
+        if self.batch_fobj:
+            return np.concatenate([np.asarray(r) for r in res])
+        return list(res)
+
+    def _evaluate_tolerant(self, evaluator, args):
+        t0 = time.perf_counter()
+        num_failed = self.fault_stats["failed"]
+        res, latency = map_tolerant(evaluator, self.fobj, args, self.eval_timeout, self.max_retry, self.fault_stats)
+        if self.profiler is not None:
+            self.profiler.add_evaluation(latency, time.perf_counter()-t0, evaluator.num_workers,
+                                         self.fault_stats["failed"] - num_failed)
+
+        if self.batch_fobj:
+            return np.concatenate([np.full((len(arg[1]),) + np.shape(self.get_failed()), FAILED) if r is None
+                                   else np.asarray(r, dtype=float) for arg, r in zip(args, res)])
+        return [self.get_failed() if r is None else r for r in res]
+
+    def count_jobs(self, num_job):
+        # job ids for the next num_job evaluations
+        job_ids = []
+        for n in range(num_job):
+            job_ids.append(self.job_id)
+            self.count_job()
+        return job_ids
 
     def count_job(self):
-        if (len(self.offspring_id) == self.num_offspring):
-            self.offspring_id = []
-        self.offspring_id.append(self.job_id)
         self.job_id += 1
 
     def reset_job_id(self):
         self.job_id = 0
-        self.offspring_id = []
 
     def next_generation(self):
         # get offsprings & evaluate scores
-        offspring = self.crossover()
-        if self.do_mutate:
-            offspring = self.mutate(offspring)
-
-        if self.use_multiprocess:
-            # split data
-            args = []
-            for n in range(self.num_offspring):
-                args.append([offspring[:,n], self.job_id])
-                self.count_job()
-
-            fitness = []
-            for n in range(self.num_overlap):
-                with mp.Pool(self.num_process) as p:
-                    fitness_tmp = p.map(self.fobj, args[n*self.num_process:(n+1)*self.num_process])
-                fitness.extend(fitness_tmp)
-
+        offspring, job_ids = self.ask()
+        with self.phase("evaluate"):
+            fitness = self.evaluate(offspring, job_ids)
+        self.tell(offspring, fitness, job_ids)
+
+    def ask(self):
+        # offspring of the next generation and their job ids
+        # evaluate them outside of EA and give the fitness with tell (see genalg.sweep)
+        if self.surrogate is not None and self.surrogate.is_ready() and self.oversample > 1:
+            candidates = self.make_offspring(self.num_offspring * self.oversample)
+            with self.phase("surrogate"):
+                pred = self.surrogate.predict(candidates)
+                pred = np.where(np.isnan(pred), -np.inf, pred)
+                id_best = np.argsort(pred)[::-1][:self.num_offspring]
+                offspring = candidates[:, id_best]
+                if self.parent_nodes is not None:
+                    self.parent_nodes = self.parent_nodes[id_best]
+                if self.offspring_mutated is not None:
+                    self.offspring_mutated = self.offspring_mutated[id_best]
         else:
-            fitness = []
-            for n in range(self.num_offspring):
-                fitness.append(self.fobj([offspring[:,n], self.job_id]))
-                self.count_job()
+            offspring = self.make_offspring()
+        with self.phase("bookkeeping"):
+            job_ids = self.count_jobs(self.num_offspring)
+        return offspring, job_ids
+
+    def tell(self, offspring, fitness, job_ids):
+        with self.phase("bookkeeping"):
+            self.select_survivors(offspring, fitness, job_ids)
+        self.clock += 1
+        self.end_generation()
 
+    def select_survivors(self, offspring, fitness, job_ids):
         # select parent to change
         id_selected, _ = self.pick_id(self.num_parent, self.num_select)
 
-        # evalutate score
-        pop_scores = np.zeros(self.num_offspring+self.num_select)
-        pop_scores[:-self.num_select] = fitness
-        pop_scores[-self.num_select:] = self.fit_score[id_selected]
-        buffer_id = self.offspring_id.copy()
-        buffer_param = self.param_vec.copy()
-        for nid in id_selected:
-            # To differentiate with offspring
-            # add index not parent job id (because at the initial, all the parent have -1 as job id)
-            buffer_id.append(-int(nid)-1) # To include "0"  
-        id_selected = list(id_selected)
-
-        # natural selection
-        id_live = self.natural_selection(pop_scores) # index
-        # print(id_live, pop_scores.shape, len(buffer_id), len(id_selected), len(self.offspring_id), self.num_offspring)
-
-        # print("buffer id:", buffer_id)
-        # print("id_live:", id_live)
-        # print("id_selected:", id_selected)
-        # print("id; ", [buffer_id[n] for n in id_live])
-
-        # check is there any negative index in buffer_id
-        # - id_live: index who lived
-        # - buffer_id: [job_id for offspring, -id_selected]
-        # - id_selected: index for selected parents
-
-        n = 0
-        while n < len(id_live):
-            nid = id_live[n]
-            b_id = buffer_id[nid]
-            if b_id < 0:
-                id_live.remove(nid)
-                buffer_id.pop(nid)
-                id_selected.remove(-b_id-1)
-                for i in range(n, len(id_live)):
-                    id_live[i] -= 1
-                n -= 1
-            n += 1
-
-        for n in id_live:
-            # print("n: %d, len_id: %d"%(n, len(buffer_id)))
-            nid = buffer_id[n] # index of the parent
-            if nid < 0:
-                # print("pop: ", n, nid)
-                id_live.pop(n)
-                buffer_id.pop(n)
-                id_selected.remove(-nid-1)
-        # print("id_live:", id_live)
-
-        # change the parent to offspring
-        for n in range(len(id_live)):
-            nid = id_live[n]
-            new_id = id_selected[n]
-            # print(nid, new_id)
-            self.param_vec[:, new_id] = offspring[:, nid]
-            self.fit_score[new_id] = pop_scores[nid]
-            self.parent_id[new_id] = buffer_id[nid]
-
-
-        # for n in range(self.num_select):
-        #     nid = id_live[n]
-        #     new_id = id_selected[n]
-        #     if nid < self.num_offspring:
-        #         self.param_vec[:, new_id] = offspring[:, nid]
-        #     else:
-        #         nold = id_selected[nid - self.num_offspring] 
-        #         self.param_vec[:, new_id] = buffer_param[:, nold]
-
-        #     self.fit_score[new_id] = pop_scores[nid]
-        #     self.parent_id[new_id] = buffer_id[nid]
+        # offspring and selected parents compete
+        if self.num_objectives > 1:
+            # non-dominated sorting and crowding distance (NSGA-II), the pool scores are -(Pareto rank)
+            pop_fitness = np.concatenate([np.asarray(fitness, dtype=float).reshape(-1, self.num_objectives),
+                                          self.objectives[id_selected]])
+            with self.phase("selection"):
+                id_live, rank = select_nsga2(pop_fitness, self.num_select)
+            pop_scores = -rank.astype(float)
+        else:
+            pop_scores = np.concatenate([np.asarray(fitness, dtype=float), self.fit_score[id_selected]])
+            pop_fitness = pop_scores
+            with self.phase("selection"):
+                id_live = self.natural_selection(pop_scores) # index
+
+        # slots of the selected parents who died are filled with the offspring who lived
+        is_live = np.zeros(len(pop_scores), dtype=bool)
+        is_live[id_live] = True
+        id_free = id_selected[~is_live[self.num_offspring:]]
+        id_child = np.where(is_live[:self.num_offspring])[0]
+        self.param_vec[:, id_free] = offspring[:, id_child]
+        self.set_fitness(id_free, pop_fitness[id_child])
+        self.parent_id[id_free] = np.asarray(job_ids)[id_child]
+        if self.do_mutate and self.offspring_mutated is not None:
+            # success of the mutated offspring only
+            is_mutated = self.offspring_mutated
+            self.get_mutation().update(np.sum(is_live[:self.num_offspring] & is_mutated), np.sum(is_mutated))
+        if self.lineage is not None:
+            nodes = self.lineage.append(job_ids, self.clock+1, self.parent_nodes, pop_scores[:self.num_offspring],
+                                        offspring)
+            self.slot_node[id_free] = nodes[id_child]
+
+    def run_steady_state(self, max_eval=1000, replacement="tournament", auto_init=True):
+        """
+        Asynchronous steady-state evolution
+        Each evaluated offspring competes with num_select randomly picked parents as soon as it returns,
+        and the freed worker gets a new offspring, so the workers do not wait for the slowest job.
+        The log is written every num_offspring evaluations. Returns the throughput (evaluations/sec)
+        """
+        if replacement not in ["tournament", "roulette"]:
+            raise ValueError("Replacement need to be tournament or roulette, selected %s"%(replacement))
 
-        self.clock += 1
+        self.check_setting()
+        if self.num_objectives > 1:
+            raise ValueError("Steady-state evolution supports single objective only")
+        own_evaluator = self._evaluator is None
+        own_history = self._history is None
+        evaluator = self.get_evaluator()
+
+        try:
+            if auto_init:
+                self.random_initialization()
+            results = queue.Queue()
+
+            def submit():
+                child = self.make_offspring(1)[:, 0]
+                parents = self.parent_nodes
+                job_id = self.job_id
+                self.count_job()
+                if self.cache is not None:
+                    # a cached offspring is not submitted
+                    val = self.cache.get(self.cache.get_key(child))
+                    if val is not None:
+                        self.cache_hits += 1
+                        results.put((child, parents, job_id, val, None, True))
+                        return
+                    self.cache_misses += 1
+                if self.batch_fobj:
+                    arg = [child[:, np.newaxis], np.array([job_id])]
+                else:
+                    arg = [child, job_id]
+                evaluator.submit(fobj, arg,
+                                 callback=lambda res: results.put((child, parents, job_id, res, None, False)),
+                                 error_callback=lambda err: results.put((child, parents, job_id, None, err, False)))
+
+            self_timed = hasattr(evaluator, "pop_latency")
+            fobj = self.fobj if self.profiler is None or self_timed else TimedCall(self.fobj)
+            if self_timed:
+                evaluator.pop_latency()
+            num_eval = 0
+            t0 = time.time()
+            t_gen = time.perf_counter()
+            num_submit = min(evaluator.num_workers, max_eval)
+            for n in range(num_submit):
+                submit()
+
+            while num_eval < max_eval:
+                child, parents, job_id, fitness, err, cached = results.get()
+                if err is not None:
+                    if not self.fault_tolerant:
+                        raise err
+                    # no retry in steady state, the failed offspring is dropped by replace_parent
+                    self.fault_stats["error"] += 1
+                    self.fault_stats["failed"] += 1
+                    fitness = FAILED
+                    if self.profiler is not None:
+                        self.profiler.add_evaluation([], 0, evaluator.num_workers, 1)
+                elif not cached:
+                    if self.profiler is not None:
+                        if self_timed:
+                            latency = evaluator.pop_latency()
+                        else:
+                            fitness, latency = fitness
+                            latency = [latency]
+                        self.profiler.add_evaluation(latency, 0, evaluator.num_workers)
+                    if self.batch_fobj:
+                        fitness = fitness[0]
+                    if self.cache is not None and not np.isnan(fitness):
+                        self.cache.set(self.cache.get_key(child), fitness)
+                        self.cache.commit()
+                if self.on_evaluation is not None:
+                    self.on_evaluation(job_id, child, fitness)
+
+                node = -1
+                if self.lineage is not None:
+                    node = self.lineage.append([job_id], self.clock+1, parents, [fitness], child[:, np.newaxis])[0]
+                with self.phase("selection"):
+                    self.replace_parent(child, fitness, job_id, replacement, node)
+                num_eval += 1
+                self.num_eval += 1
+                if self.surrogate is not None:
+                    self.surrogate.update(child[:, np.newaxis], [fitness])
+                if num_eval % self.num_offspring == 0:
+                    self.clock += 1
+                    if self.profiler is not None:
+                        self.profiler.add_evaluation([], time.perf_counter()-t_gen, evaluator.num_workers)
+                        t_gen = time.perf_counter()
+                    self.end_generation()
+                    self.print_log()
+
+                if num_submit < max_eval:
+                    submit()
+                    num_submit += 1
+            self.eval_rate = num_eval / (time.time() - t0)
+        finally:
+            if own_evaluator:
+                self.close_evaluator()
+            if own_history:
+                self.close_history()
+        return self.eval_rate
+
+    def replace_parent(self, child, fitness, job_id, replacement="tournament", node=-1):
+        # steady-state replacement: the offspring replaces one of num_select randomly picked parents if it is better
+        if np.isnan(fitness):
+            return False
 
-    # def natural_selection(self, fitness, num_select=5):
-    #     id_sort = np.argsort(fitness)[::-1]
-    #     return id_sort[:num_select]
+        id_selected, _ = self.pick_id(self.num_parent, self.num_select)
+        scores = self.fit_score[id_selected]
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+
+        if replacement == "tournament":
+            # the worst one
+            nid = id_selected[np.argmin(scores)]
+        elif replacement == "roulette":
+            # worse parent has higher chance to be picked
+            if np.all(np.isfinite(scores)):
+                w = np.max(scores) - scores + 1e-12
+                nid = self.rng.choice(id_selected, p=w/np.sum(w))
+            else:
+                nid = self.rng.choice(id_selected[np.isinf(scores)])
+
+        if np.isnan(self.fit_score[nid]) or fitness > self.fit_score[nid]:
+            self.param_vec[:, nid] = child
+            self.fit_score[nid] = fitness
+            self.parent_id[nid] = job_id
+            self.slot_node[nid] = node
+            return True
+        return False
 
     def natural_selection(self, fitness, num_opt_select=2):
-        id_tot = list(range(self.num_offspring+self.num_select))
-        # find the best model
-        id_select = []
-        for n in range(num_opt_select):
-            n_best = np.nanargmax(fitness[id_tot])
-            id_tot.pop(n_best)
-            id_select.append(n_best)
-
-        # clean nan
-        id_nan = np.where(np.isnan(fitness))[0]
-        id_tot = remove_index(id_tot, id_nan)
-
-        # use Roullete-Wheel method
-        fitness_pos = fitness[id_tot]
-        fmin = np.nanmin(fitness_pos)
-        if fmin < 0:
-            fitness_pos += fmin
-        fitness_pos = list(fitness_pos)
-
-        for n in range(self.num_select-num_opt_select):
-            prob_select = np.array(fitness_pos) / np.sum(fitness_pos)
-            p = np.random.rand()
-            i, p_cum = 0, 0
-            while p_cum < p:
-                i += 1
-                if (i == len(prob_select)):
-                    break
-
-                p_cum += prob_select[i]
-            i -= 1
-            # pick
-            id_select.append(id_tot[i])
-            fitness_pos.pop(i)
-
-        id_select = list(np.sort(id_select))
-
-        return id_select
-
-    def crossover(self):
-        offspring = np.ones([self.num_params, self.num_offspring]) * (-1)
-        for n in range(self.num_offspring):
-            # check boundary condition
-            flag = True
-            stack = 0
-            while flag:
+        # index of num_select survivors among [offspring, selected parents], see genalg.selection
+        return select(self.selection, fitness, self.num_select, num_opt_select, self.rng)
+
+    def make_offspring(self, num_child=None):
+        # crossover and mutation in the internal space of the boundary (the parameter itself without transform)
+        with self.phase("crossover"):
+            offspring = self.crossover(num_child)
+        if self.lineage is not None:
+            # parent slots can be replaced before the offspring returns (steady state), keep the nodes
+            p = self.offspring_parents
+            self.parent_nodes = np.where(p >= 0, self.slot_node[np.maximum(p, 0)], -1)
+        if self.do_mutate:
+            with self.phase("mutate"):
+                offspring = self.mutate(offspring)
+        return self.boundary.to_external(offspring)
+
+    def crossover(self, num_child=None):
+        if num_child is None:
+            num_child = self.num_offspring
+
+        if self.batch_crossover:
+            return self.crossover_batch(num_child)
+
+        offspring = np.ones([self.num_params, num_child]) * (-1)
+        # index of the crossover parents, -1 for the random offspring
+        self.offspring_parents = np.ones([num_child, self.mu+1], dtype=np.int64) * (-1)
+        boundary = self.get_boundary()
+        boundary.num_child += num_child
+        param_vec = boundary.to_internal(self.param_vec)
+        for n in range(num_child):
+            # check boundary condition, an offspring out of a "reject" parameter is drawn again
+            for stack in range(5):
                 if self.crossover_type == "pcx":
-                    offspring_tmp = self.crossover_pcx()
+                    offspring_tmp = self.crossover_pcx(param_vec)
                 elif self.crossover_type == "undx":
-                    offspring_tmp = self.crossover_undx()
+                    offspring_tmp = self.crossover_undx(param_vec)
 
-                if all(offspring_tmp <= self.pmax) and all(offspring_tmp >= self.pmin):
-                    offspring[:, n] = offspring_tmp
-                    break
-                
-                stack += 1
-                if stack == 5:
-                    offspring[:, n] = np.random.uniform(self.pmin, self.pmax)
+                offspring_tmp = offspring_tmp.reshape([-1, 1])
+                if not boundary.repair(offspring_tmp)[0]:
+                    offspring[:, n] = offspring_tmp[:, 0]
+                    self.offspring_parents[n, :len(self._last_parents)] = self._last_parents
                     break
+            else:
+                offspring[:, n] = self.rng.uniform(boundary.lower, boundary.upper)
+                boundary.num_random += 1
+
+        return offspring
+
+    def crossover_batch(self, num_child=None):
+        # build all offspring at once, see genalg.crossover
+        if num_child is None:
+            num_child = self.num_offspring
+
+        if self.crossover_type == "pcx":
+            f = crossover_pcx_batch
+        elif self.crossover_type == "undx":
+            f = crossover_undx_batch
+
+        boundary = self.get_boundary()
+        boundary.num_child += num_child
+        param_vec = boundary.to_internal(self.param_vec)
+        offspring, id_select = f(param_vec, num_child, self.mu, self.sgm_eta, self.sgm_xi,
+                                 return_parents=True, rng=self.rng)
+        self.offspring_parents = np.ones([num_child, self.mu+1], dtype=np.int64) * (-1)
+        self.offspring_parents[:, :id_select.shape[1]] = id_select
+        # repair, and redraw the offspring out of a "reject" parameter (5 trials in total as crossover)
+        is_out = boundary.repair(offspring)
+        for stack in range(5):
+            num_out = np.sum(is_out)
+            if num_out == 0:
+                break
+
+            if stack < 4:
+                redraw, id_select = f(param_vec, num_out, self.mu, self.sgm_eta, self.sgm_xi,
+                                      return_parents=True, rng=self.rng)
+                is_redraw_out = boundary.repair(redraw)
+                offspring[:, is_out] = redraw
+                self.offspring_parents[is_out, :id_select.shape[1]] = id_select
+                is_out[is_out] = is_redraw_out
+            else:
+                offspring[:, is_out] = self.rng.uniform(boundary.lower[:, None], boundary.upper[:, None],
+                                                        (self.num_params, num_out))
+                self.offspring_parents[is_out] = -1
+                boundary.num_random += num_out
 
         return offspring
 
-    def crossover_undx(self):
+    def crossover_undx(self, param_vec=None):
         # ==================================
         # Ref)
         # H. Kita & M. Yamamura, IEEE, 1999, A Functional Specialization Hypothesis for Designing Genetic Algorithms
@@ -306,106 +841,197 @@ class EA:
 
         # select mu parents (mu < n), span the vectorspace V
         id_select, id_remain = self.pick_id(self.num_parent, self.mu)
-        g_vec = np.average(self.param_vec[:, id_select], axis=1)
-        d_vec = self.param_vec[:, id_select[:-1]] - g_vec[:, np.newaxis]
-
-        # check is d_vec is null vector
-        if get_norm(d_vec) < 1e-5:
-            return g_vec
-        else:
-            # find the basis of vector space W that orthogonal to vector space V
-            basis = null_space(d_vec.T)
-
-            # find the distance from the vector space which spanned by d_vec
-            nd = np.random.choice(id_remain)
-            v = self.param_vec[:, nd] - g_vec
-            coord = np.array([np.dot(v, basis[:,n]) for n in range(basis.shape[1])])
-            D = np.sqrt(np.sum(coord**2))
-
-        # get offspring
-        offspring = g_vec
-        # 1st term
-        eta = np.random.randn(self.mu-1, 1) * self.sgm_eta
-        offspring += np.squeeze(np.dot(d_vec, eta))
-        # 2nd term
-        # xi = np.random.randn(self.num_params-self.mu+1, 1) * self.sgm_xi
-        xi = np.random.randn(basis.shape[1], 1) * self.sgm_xi
-        offspring += np.squeeze(D * np.dot(basis, xi))
-        # print(basis.shape, xi.shape, d_vec.shape, d_vec, self.mu)
-
-        return offspring
-
-    def crossover_pcx(self):
+        # one of the remaining parents gives the distance from V
+        nd = id_remain[int(self.rng.random() * len(id_remain))]
+        self._last_parents = list(id_select) + [nd]
+
+        # the math is done in genalg._kernels (compiled with numba if available)
+        if param_vec is None:
+            param_vec = self.param_vec
+        eta = self.rng.standard_normal(self.mu-1)
+        z = self.rng.standard_normal(self.num_params)
+        return undx_offspring(param_vec[:, id_select], param_vec[:, nd], eta, z, self.sgm_eta, self.sgm_xi)
+
+    def crossover_pcx(self, param_vec=None):
         # select mu parents (mu < n), span the vectorspace V
         id_select, id_remain = self.pick_id(self.num_parent, self.mu)
-        g_vec = np.average(self.param_vec[:, id_select], axis=1)
-
-        # select one parents from selected id
-        nd = np.random.choice(id_select)
-        x_pick = self.param_vec[:, nd]
-        d_vec = x_pick - g_vec
-        if all(np.array(d_vec) == 0):
-            return x_pick
-
-        id_select = list(id_select)
-        id_select = remove_element(id_select, nd)
-
-        # calculate average distance
-        D = 0
-        for i in id_select:
-            D += get_distance(self.param_vec[:, i], d_vec)
-        D /= self.mu - 1
-
-        # get basis vector which span the perpendicular to vector d
-        tmp_vec = np.concatenate([d_vec.reshape([-1, 1]), self.param_vec[:, id_select]], axis=1)
-        basis = gram_schmidt(tmp_vec)
-        basis = basis[:, 1:]
-
-        # offspring
-        offspring = x_pick.copy()
-        offspring += np.random.randn() * self.sgm_eta * d_vec
-        tmp = D * np.dot(basis, np.random.randn(self.mu-1, 1)) * self.sgm_xi
-        offspring += np.squeeze(D * np.dot(basis, np.random.randn(self.mu-1, 1)) * self.sgm_xi)
-        
-        return offspring
+
+        # select one parents from selected id, picked parent first
+        nd = id_select[int(self.rng.random() * len(id_select))]
+        self._last_parents = [nd] + [i for i in id_select if i != nd]
+
+        if param_vec is None:
+            param_vec = self.param_vec
+        eta = self.rng.standard_normal()
+        xi = self.rng.standard_normal(self.mu-1)
+        return pcx_offspring(param_vec[:, self._last_parents], eta, xi, self.sgm_eta, self.sgm_xi)
     
     def pick_id(self, max_id, num_pick):
-        id_remain = list(range(max_id))
-        id_select = np.random.choice(id_remain, num_pick, replace=False)
-        for nid in id_select:
-            id_remain.remove(nid)
-        id_remain = np.array(id_remain)
-        return id_select, id_remain
+        # num_pick smallest of random keys, distinct ids without the cost of Generator.choice
+        id_select = np.argpartition(self.rng.random(max_id), num_pick-1)[:num_pick] if num_pick < max_id \
+            else self.rng.permutation(max_id)
+        is_remain = np.ones(max_id, dtype=bool)
+        is_remain[id_select] = False
+        return id_select, np.where(is_remain)[0]
 
     def mutate(self, offspring):
-        p_th = 0.01/self.num_params
-        
-        for n in range(self.num_offspring):
-            for i in range(self.num_params):
-                if np.random.rand() < p_th:
-                    sgm = (self.pmax[i] - self.pmin[i])/5
-                    x = offspring[i, n] + np.random.randn()*sgm
-                    if x > self.pmax[i]:
-                        x = self.pmax[i]
-                    if x < self.pmin[i]:
-                        x = self.pmin[i]
-                    
-                    offspring[i, n] = x
-
+        # the mutated genes are sampled directly (binomial count + positions), see genalg.mutation
+        # the mutated columns are kept in offspring_mutated for the adaptive operator
+        boundary = self.get_boundary()
+        offspring, self.offspring_mutated = mutate(offspring, boundary.lower, boundary.upper, self.mutation_rate,
+                                                   self.get_mutation(), self.rng)
         return offspring
 
     def print_log(self, skip_save_param=1):
+        if self.lineage is not None:
+            self.lineage.flush()
+        if self.profiler is None:
+            self.write_log(skip_save_param)
+            return
+
+        t0, c0 = time.perf_counter(), time.process_time()
+        num_bytes = self.write_log(skip_save_param)
+        self.profiler.add_log(self.clock, time.perf_counter()-t0, time.process_time()-c0, num_bytes)
+        self.profiler.export(os.path.join(self.log_dir, "metrics.jsonl"))
+
+    def write_log(self, skip_save_param=1):
+        # returns the number of bytes written
+        if self.log_format == "binary":
+            # parameters are saved every generation, skip_save_param is not used
+            if self._history is None:
+                self._history = HistoryWriter(self.log_dir, self.num_params, self.num_parent,
+                                              flush_every=self.log_flush_every, num_objectives=self.num_objectives)
+            self._history.append(self.clock, self.parent_id, self.fit_score, self.param_vec, self.objectives)
+            num_values = self.param_vec.size + (0 if self.objectives is None else self.objectives.size)
+            return 8 * (1 + 2*self.num_parent + num_values)
+
         # save fitness
         with open(os.path.join(self.log_dir, "log.txt"), "a") as fid:
+            n0 = fid.tell()
             for n in range(self.num_parent):
                 fid.write("%d:%f,"%(self.parent_id[n], self.fit_score[n]))
             fid.write("\n")
+            num_bytes = fid.tell() - n0
+
+        # save objectives, "id:obj1;obj2;...," for each parent (read by Logger.get_objectives)
+        if self.objectives is not None:
+            with open(os.path.join(self.log_dir, "objectives.txt"), "a") as fid:
+                n0 = fid.tell()
+                for n in range(self.num_parent):
+                    fid.write("%d:%s,"%(self.parent_id[n], ";".join("%f"%(v) for v in self.objectives[n])))
+                fid.write("\n")
+                num_bytes += fid.tell() - n0
 
         # save parameters
         if self.clock % skip_save_param == 0:
             data = {"job_id": self.parent_id, "params": self.param_vec}
+            if self.objectives is not None:
+                data["objectives"] = self.objectives
             with open(os.path.join(self.log_dir, "params_%d.pkl"%(self.clock)), "wb") as fid:
                 pkl.dump(data, fid)
+                num_bytes += fid.tell()
+
+        return num_bytes
+
+    def save_checkpoint(self, fname=None):
+        """
+        Save the complete state of EA (population, counters, random state, config)
+        The file is written to fname.tmp and renamed, so the previous checkpoint is kept when it fails
+        """
+        if fname is None:
+            fname = os.path.join(self.log_dir, "checkpoint.pkl")
+
+        # position of the log, to remove the generations written after this checkpoint when it is loaded
+        if self.log_format == "binary":
+            if self._history is not None:
+                self._history.flush()
+            log_pos = read_meta(self.log_dir)["num_gen"] if is_history(self.log_dir) else 0
+        else:
+            log_fname = os.path.join(self.log_dir, "log.txt")
+            log_pos = os.path.getsize(log_fname) if os.path.exists(log_fname) else 0
+        obj_fname = os.path.join(self.log_dir, "objectives.txt")
+        obj_pos = os.path.getsize(obj_fname) if os.path.exists(obj_fname) else 0
+
+        if self.lineage is not None:
+            self.lineage.flush()
+
+        state = {"config": {key: getattr(self, key) for key in CHECKPOINT_CONFIG},
+                 "param_vec": self.param_vec, "fit_score": self.fit_score, "parent_id": self.parent_id,
+                 "clock": self.clock, "job_id": self.job_id,
+                 "cache_hits": self.cache_hits, "cache_misses": self.cache_misses, "num_eval": self.num_eval,
+                 "fault_stats": self.fault_stats, "objectives": self.objectives, "obj_pos": obj_pos,
+                 "rng": self.rng, "mutation_op": self.mutation_op, "log_pos": log_pos, "slot_node": self.slot_node,
+                 "surrogate": self.surrogate, "oversample": self.oversample,
+                 "convergence": self.convergence, "num_restart": self.num_restart,
+                 "lineage_pos": self.lineage.num_node if self.lineage is not None else 0}
+
+        with open(fname + ".tmp", "wb") as fid:
+            pkl.dump(state, fid)
+            fid.flush()
+            os.fsync(fid.fileno())
+        os.replace(fname + ".tmp", fname)
+
+    def load_checkpoint(self, fname=None):
+        """
+        Restore the state saved by save_checkpoint, the cost does not depend on the length of the run
+        The log written after the checkpoint is truncated, so the evolution continues identically
+        """
+        if fname is None:
+            fname = os.path.join(self.log_dir, "checkpoint.pkl")
+
+        with open(fname, "rb") as fid:
+            state = pkl.load(fid)
+
+        if state["config"]["num_params"] != self.num_params:
+            raise AttributeError("The # of params in checkpoint (%d) is different with current (%d)"%(
+                state["config"]["num_params"], self.num_params))
+
+        self.close_history()
+        for key, val in state["config"].items():
+            setattr(self, key, val)
+        self.param_vec = np.array(state["param_vec"])
+        self.fit_score = np.array(state["fit_score"])
+        self.objectives = None if state.get("objectives") is None else np.array(state["objectives"])
+        self.parent_id = np.array(state["parent_id"])
+        self.clock = state["clock"]
+        self.job_id = state["job_id"]
+        self.cache_hits = state["cache_hits"]
+        self.cache_misses = state["cache_misses"]
+        self.num_eval = state["num_eval"]
+        self.fault_stats = dict(state.get("fault_stats", new_fault_stats()))
+        self.mutation_op = state.get("mutation_op")
+        if state.get("surrogate") is not None:
+            self.surrogate = state["surrogate"]
+            self.oversample = state["oversample"]
+        self.convergence = state.get("convergence")
+        self.num_restart = state.get("num_restart", 0)
+        self.boundary = None
+        if "rng" in state:
+            self.rng = state["rng"]
+        else:
+            # checkpoint of the global np.random state
+            np.random.set_state(state["rng_state"])
+        self.slot_node = np.array(state.get("slot_node", np.ones(self.num_parent) * (-1)), dtype=np.int64)
+        if self.lineage is not None:
+            self.lineage.truncate(state.get("lineage_pos", 0))
+
+        if self.log_format == "binary":
+            if is_history(self.log_dir):
+                truncate_history(self.log_dir, state["log_pos"])
+        else:
+            log_fname = os.path.join(self.log_dir, "log.txt")
+            if os.path.exists(log_fname) and os.path.getsize(log_fname) > state["log_pos"]:
+                os.truncate(log_fname, state["log_pos"])
+                # line-offset index of Logger is rebuilt on the next read
+                from .logger import INDEX_NAME
+                if os.path.exists(os.path.join(self.log_dir, INDEX_NAME)):
+                    os.remove(os.path.join(self.log_dir, INDEX_NAME))
+            obj_fname = os.path.join(self.log_dir, "objectives.txt")
+            if os.path.exists(obj_fname) and os.path.getsize(obj_fname) > state.get("obj_pos", 0):
+                os.truncate(obj_fname, state.get("obj_pos", 0))
+                from .logger import OBJ_INDEX_NAME
+                if os.path.exists(os.path.join(self.log_dir, OBJ_INDEX_NAME)):
+                    os.remove(os.path.join(self.log_dir, OBJ_INDEX_NAME))
 
     def load_history(self, fdir_history=None):
         """
@@ -417,27 +1043,48 @@ class EA:
         if fdir_history is None:
             fdir_history = self.log_dir
 
+        self.close_history()
         log_obj = gl.Logger(fdir_history)
-        max_param_id = len(log_obj.fit_scores)
-        log_obj.load_params(max_param_id-1)
+        max_param_id = log_obj.num_generations
+        if log_obj.is_binary:
+            log_obj.load_params(log_obj.history.clocks[-1])
+        else:
+            # params_N.pkl is saved with the last (N-th) line of log.txt
+            log_obj.load_params(max_param_id)
 
         num = np.shape(log_obj.param_set)[0]
         if num != self.num_params:
             raise AttributeError("The # of params in prev (%d) is different withh current mu (%d)"%(num, self.num_params))
+        if self.num_objectives > 1:
+            if log_obj.objective_set is None or np.shape(log_obj.objective_set)[1] != self.num_objectives:
+                raise AttributeError("There is no history of %d objectives in %s"%(self.num_objectives, fdir_history))
 
         # copy
-        if fdir_history != self.log_dir:
+        if log_obj.is_binary:
+            # the binary history is append-only, the original does not need to be saved
+            if fdir_history != self.log_dir:
+                copy_history(fdir_history, self.log_dir)
+        elif fdir_history != self.log_dir:
             shutil.copy(os.path.join(fdir_history, "log.txt"), 
                         os.path.join(self.log_dir, "log.txt"))
+            if self.num_objectives > 1:
+                shutil.copy(os.path.join(fdir_history, "objectives.txt"), os.path.join(self.log_dir, "objectives.txt"))
         else: # save original file
             shutil.copy(os.path.join(fdir_history, "log.txt"), 
                         os.path.join(fdir_history, "log_prev.txt"))
         
-        self.param_vec = log_obj.param_set
-        self.parent_id = log_obj.job_id_set
-        self.job_id = max_param_id
+        self.param_vec = np.array(log_obj.param_set)
+        self.parent_id = np.array(log_obj.job_id_set)
+        self.slot_node = np.ones(self.num_parent, dtype=np.int64) * (-1)
+        # each generation evaluates num_offspring jobs (use load_checkpoint to restore the exact state)
+        self.job_id = max_param_id * self.num_offspring
         self.clock = max_param_id
-        self.fit_score = np.array(log_obj.fit_scores[-1])
+        if self.num_objectives > 1:
+            # the fitness is -(Pareto rank) of the restored objectives
+            self.objectives = np.array(log_obj.objective_set, dtype=float)
+            self.fit_score = -non_dominated_sort(self.objectives).astype(float)
+        else:
+            self.fit_score = np.array(log_obj.get_generation(-1)[0])
 
 
 # def remove_index(arr_list, id_target):
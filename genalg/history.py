@@ -0,0 +1,205 @@
+import numpy as np
+import json
+import os
+import pickle as pkl
+
+
+# Binary, append-only history of the population
+# Every generation appends one row to each file of the family
+#   history_clock.bin  : int64   [num_gen]
+#   history_id.bin     : int64   [num_gen, num_parent]            (parent_id)
+#   history_fit.bin    : float64 [num_gen, num_parent]            (fit_score)
+#   history_params.bin : float64 [num_gen, num_params, num_parent] (param_vec)
+#   history_obj.bin    : float64 [num_gen, num_parent, num_objectives] (objectives, only with num_objectives > 1)
+# history.json keeps the shapes and the number of written generations.
+# The files are grown by chunk_size generations, so the written part can be memmapped without copy.
+
+META_NAME = "history.json"
+FIELDS = {"clock": np.int64, "id": np.int64, "fit": np.float64, "params": np.float64}
+OBJ_FIELD = {"obj": np.float64}
+
+
+def get_fname(log_dir, field):
+    return os.path.join(log_dir, "history_%s.bin"%(field))
+
+
+def is_history(log_dir):
+    return os.path.exists(os.path.join(log_dir, META_NAME))
+
+
+def read_meta(log_dir):
+    with open(os.path.join(log_dir, META_NAME), "r") as fid:
+        return json.load(fid)
+
+
+def write_meta(log_dir, meta):
+    # write-then-rename, the meta is never partially written
+    fname = os.path.join(log_dir, META_NAME)
+    with open(fname + ".tmp", "w") as fid:
+        json.dump(meta, fid)
+    os.replace(fname + ".tmp", fname)
+
+
+def get_fields(meta):
+    if meta.get("num_objectives", 1) > 1:
+        return dict(FIELDS, **OBJ_FIELD)
+    return FIELDS
+
+
+def get_row_shape(meta, field):
+    if field == "clock":
+        return ()
+    elif field == "params":
+        return (meta["num_params"], meta["num_parent"])
+    elif field == "obj":
+        return (meta["num_parent"], meta["num_objectives"])
+    else:
+        return (meta["num_parent"],)
+
+
+class HistoryWriter:
+    def __init__(self, log_dir, num_params, num_parent, chunk_size=1024, flush_every=10, num_objectives=1):
+        self.log_dir = log_dir
+        self.chunk_size = int(chunk_size)
+        self.flush_every = int(flush_every)
+        self.buffer = []
+
+        if is_history(log_dir):
+            # append to the previous history
+            self.meta = read_meta(log_dir)
+            if self.meta["num_params"] != num_params or self.meta["num_parent"] != num_parent or \
+                    self.meta.get("num_objectives", 1) != num_objectives:
+                raise ValueError("The shape of the history in %s (%d params, %d parents, %d objectives) is different"%(
+                    log_dir, self.meta["num_params"], self.meta["num_parent"], self.meta.get("num_objectives", 1)))
+        else:
+            self.meta = {"num_params": int(num_params), "num_parent": int(num_parent),
+                         "num_gen": 0, "capacity": 0}
+            if num_objectives > 1:
+                self.meta["num_objectives"] = int(num_objectives)
+            for field in get_fields(self.meta):
+                open(get_fname(log_dir, field), "wb").close()
+            write_meta(log_dir, self.meta)
+
+    def append(self, clock, parent_id, fit_score, param_vec, objectives=None):
+        data = {"clock": clock, "id": np.array(parent_id), "fit": np.array(fit_score), "params": np.array(param_vec)}
+        if objectives is not None:
+            data["obj"] = np.array(objectives)
+        self.buffer.append(data)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if len(self.buffer) == 0:
+            return
+
+        n0 = self.meta["num_gen"]
+        n1 = n0 + len(self.buffer)
+        if n1 > self.meta["capacity"]:
+            self.grow(n1)
+
+        for field, dtype in get_fields(self.meta).items():
+            shape = (self.meta["capacity"],) + get_row_shape(self.meta, field)
+            arr = np.memmap(get_fname(self.log_dir, field), dtype=dtype, mode="r+", shape=shape)
+            arr[n0:n1] = [data[field] for data in self.buffer]
+            arr.flush()
+            del arr
+
+        self.buffer = []
+        self.meta["num_gen"] = n1
+        write_meta(self.log_dir, self.meta)
+
+    def grow(self, num_gen):
+        # preallocate by chunk
+        capacity = int(np.ceil(num_gen / self.chunk_size) * self.chunk_size)
+        for field, dtype in get_fields(self.meta).items():
+            row_size = int(np.prod(get_row_shape(self.meta, field))) * np.dtype(dtype).itemsize
+            os.truncate(get_fname(self.log_dir, field), capacity * row_size)
+        self.meta["capacity"] = capacity
+
+    def close(self):
+        self.flush()
+
+
+class HistoryReader:
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.meta = read_meta(log_dir)
+        self.num_gen = self.meta["num_gen"]
+        self.clocks = self.open("clock")
+        self.job_ids = self.open("id")
+        self.fit_scores = self.open("fit")
+        self.params = self.open("params")
+        self.objectives = self.open("obj") if "obj" in get_fields(self.meta) else None
+
+    def open(self, field):
+        # memmap only the written generations
+        shape = (self.num_gen,) + get_row_shape(self.meta, field)
+        dtype = get_fields(self.meta)[field]
+        if self.num_gen == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(get_fname(self.log_dir, field), dtype=dtype, mode="r", shape=shape)
+
+    def find_generation(self, clock):
+        nid = np.where(self.clocks == clock)[0]
+        if len(nid) == 0:
+            raise IndexError("clock %d is not in the history"%(clock))
+        return nid[-1]
+
+
+def truncate_history(log_dir, num_gen):
+    # drop the generations after num_gen, the file size is kept
+    meta = read_meta(log_dir)
+    if num_gen < meta["num_gen"]:
+        meta["num_gen"] = int(num_gen)
+        write_meta(log_dir, meta)
+
+
+def copy_history(src_dir, dst_dir):
+    import shutil
+    for field in get_fields(read_meta(src_dir)):
+        shutil.copy(get_fname(src_dir, field), get_fname(dst_dir, field))
+    shutil.copy(os.path.join(src_dir, META_NAME), os.path.join(dst_dir, META_NAME))
+
+
+def migrate_text_log(src_dir, dst_dir=None, chunk_size=1024):
+    """
+    Convert log.txt + params_N.pkl in src_dir to the binary history
+    The n-th line of log.txt is written by print_log at clock n+1,
+    the generation without params_N.pkl gets nan parameters
+    """
+    from .logger import Logger
+
+    if dst_dir is None:
+        dst_dir = src_dir
+    if is_history(dst_dir):
+        raise FileExistsError("History already exists in %s"%(dst_dir))
+
+    log_obj = Logger(src_dir)
+    param_files = {}
+    for f in os.listdir(src_dir):
+        if f.startswith("params_") and f.endswith(".pkl"):
+            param_files[int(f[7:-4])] = os.path.join(src_dir, f)
+
+    num_params = None
+    for f in param_files.values():
+        with open(f, "rb") as fid:
+            num_params = np.shape(pkl.load(fid)["params"])[0]
+        break
+    if num_params is None:
+        raise FileNotFoundError("There is no params_N.pkl in %s"%(src_dir))
+
+    num_parent = len(log_obj.get_generation(0)[0])
+    writer = HistoryWriter(dst_dir, num_params, num_parent, chunk_size=chunk_size, flush_every=chunk_size)
+    clock = 0
+    for fit_scores, job_ids in log_obj.iter_generations(chunk_size):
+        for n in range(len(fit_scores)):
+            clock += 1
+            if clock in param_files:
+                with open(param_files[clock], "rb") as fid:
+                    params = pkl.load(fid)["params"]
+            else:
+                params = np.ones([num_params, num_parent]) * np.nan
+            writer.append(clock, job_ids[n], fit_scores[n], params)
+    writer.close()
+
+    return dst_dir
@@ -0,0 +1,159 @@
+import numpy as np
+import os
+import sys
+import threading
+import time
+
+
+# exit code of an island stopped by the broken barrier (another island failed or timed out)
+EXIT_ABORTED = 2
+
+
+class IslandModel:
+    """
+    Island model: num_islands EA populations evolve in separate processes
+    Every migrate_every generations, the best num_migrants of each island are written
+    to a shared-memory buffer and replace the worst parents of the destination islands.
+    topology: ring (from island i-1), full (from all other islands), random (from one random island)
+    make_solver(island_id, log_dir) needs to return EA with object function and boundary set
+    If an island fails, the barrier is aborted and the other islands exit. barrier_timeout (s) bounds the
+    wait for the slowest island at each migration (None: no limit)
+    """
+    def __init__(self, make_solver, num_params, num_islands=4, log_dir="./log", migrate_every=10,
+                 num_migrants=2, topology="ring", seed=None, barrier_timeout=3600):
+        if topology not in ["ring", "full", "random"]:
+            raise ValueError("Topology need to be ring, full or random, selected %s"%(topology))
+
+        self.make_solver = make_solver
+        self.num_params = int(num_params)
+        self.num_islands = int(num_islands)
+        self.log_dir = log_dir
+        self.migrate_every = int(migrate_every)
+        self.num_migrants = int(num_migrants)
+        self.topology = topology
+        self.barrier_timeout = barrier_timeout
+        self.seed_seq = np.random.SeedSequence(seed)
+
+    def get_sources(self, island_id, epoch):
+        # islands sending migrants to island_id at the epoch-th migration
+        if self.topology == "ring":
+            return [(island_id - 1) % self.num_islands]
+        elif self.topology == "full":
+            return [n for n in range(self.num_islands) if n != island_id]
+        elif self.topology == "random":
+            # same permutation in every island
+            rng = np.random.default_rng([self.seed_seq.entropy, epoch])
+            perm = rng.permutation(self.num_islands)
+            return [perm[(np.where(perm == island_id)[0][0] - 1) % self.num_islands]]
+
+    def run(self, max_iter=100):
+        import multiprocess as mp
+        # shared buffers, [island, migrant, params + fitness] and [island, best fitness + num eval + best params]
+        migrants = mp.RawArray("d", self.num_islands * self.num_migrants * (self.num_params+1))
+        stats = mp.RawArray("d", self.num_islands * (self.num_params+2))
+        barrier = mp.Barrier(self.num_islands)
+        seeds = self.seed_seq.spawn(self.num_islands)
+
+        t0 = time.time()
+        procs = []
+        for n in range(self.num_islands):
+            p = mp.Process(target=run_island, args=(self, n, seeds[n], max_iter, migrants, stats, barrier))
+            p.start()
+            procs.append(p)
+
+        for p in procs:
+            p.join()
+        self.elapsed = time.time() - t0
+
+        failed = [n for n, p in enumerate(procs) if p.exitcode not in (0, EXIT_ABORTED)]
+        if len(failed) > 0:
+            raise RuntimeError("Island %s exited with code %s"%(failed, [procs[n].exitcode for n in failed]))
+        aborted = [n for n, p in enumerate(procs) if p.exitcode == EXIT_ABORTED]
+        if len(aborted) > 0:
+            raise RuntimeError("Island %s stopped at the migration barrier (timeout %s s)"%(aborted, self.barrier_timeout))
+
+        stats = np.frombuffer(stats).reshape(self.num_islands, -1)
+        self.best_scores = stats[:, 0].copy()
+        self.num_eval = int(np.sum(stats[:, 1]))
+        self.eval_rate = self.num_eval / self.elapsed
+        n_best = np.nanargmax(self.best_scores)
+        self.best_island = n_best
+        self.best_params = stats[n_best, 2:].copy()
+
+        return self.best_scores[n_best]
+
+
+def run_island(model, island_id, seed, max_iter, migrants, stats, barrier):
+    try:
+        evolve_island(model, island_id, seed, max_iter, migrants, stats, barrier)
+    except threading.BrokenBarrierError:
+        print("Island %d: barrier is broken, stop"%(island_id))
+        sys.exit(EXIT_ABORTED)
+    except BaseException:
+        # release the other islands waiting at the barrier
+        barrier.abort()
+        raise
+
+
+def evolve_island(model, island_id, seed, max_iter, migrants, stats, barrier):
+    # the global state is seeded for make_solver, the solver draws from its own child stream
+    np.random.seed(seed.generate_state(1)[0])
+    log_dir = os.path.join(model.log_dir, "island%d"%(island_id))
+    os.makedirs(log_dir, exist_ok=True)
+
+    solver = model.make_solver(island_id, log_dir)
+    solver.log_dir = log_dir
+    solver.set_seed(seed)
+    solver.check_setting()
+    if solver.num_objectives > 1:
+        raise ValueError("Island model supports single objective only")
+
+    migrants = np.frombuffer(migrants).reshape(model.num_islands, model.num_migrants, -1)
+    stats = np.frombuffer(stats).reshape(model.num_islands, -1)
+
+    def update_stats():
+        scores = np.where(np.isnan(solver.fit_score), -np.inf, solver.fit_score)
+        n_best = np.argmax(scores)
+        if scores[n_best] > stats[island_id, 0]:
+            stats[island_id, 0] = scores[n_best]
+            stats[island_id, 2:] = solver.param_vec[:, n_best]
+        stats[island_id, 1] = num_eval
+
+    with solver:
+        solver.random_initialization()
+        num_eval = solver.num_parent
+        stats[island_id, 0] = -np.inf
+        update_stats()
+
+        for n in range(max_iter):
+            solver.next_generation()
+            solver.print_log()
+            num_eval += solver.num_offspring
+            update_stats()
+
+            if (n+1) % model.migrate_every != 0:
+                continue
+
+            # send the best individuals
+            scores = np.where(np.isnan(solver.fit_score), -np.inf, solver.fit_score)
+            id_sort = np.argsort(scores)
+            id_best = id_sort[::-1][:model.num_migrants]
+            migrants[island_id, :, :-1] = solver.param_vec[:, id_best].T
+            migrants[island_id, :, -1] = solver.fit_score[id_best]
+            barrier.wait(model.barrier_timeout)
+
+            # receive the best of incoming individuals
+            sources = model.get_sources(island_id, (n+1) // model.migrate_every)
+            incoming = np.concatenate([migrants[src] for src in sources])
+            in_sources = np.repeat(sources, model.num_migrants)
+            barrier.wait(model.barrier_timeout)
+
+            in_scores = np.where(np.isnan(incoming[:, -1]), -np.inf, incoming[:, -1])
+            id_in = np.argsort(in_scores)[::-1][:model.num_migrants]
+            incoming = incoming[id_in]
+            for nid, x in zip(id_sort[:len(incoming)], incoming):
+                solver.param_vec[:, nid] = x[:-1]
+                solver.fit_score[nid] = x[-1]
+                solver.parent_id[nid] = -1
+            # migrants are roots of the lineage, tagged with the source island
+            solver.record_roots(id_sort[:len(incoming)], -np.ones(len(incoming)), in_sources[id_in])
@@ -0,0 +1,268 @@
+import numpy as np
+import json
+import os
+
+
+# Genealogy of the evaluated individuals (EA.enable_lineage)
+# Every evaluation appends one node, the node id is the row of the arrays
+#   job     : int64   [num_node]              job id given to the object function (-1 for migrants)
+#   clock   : int64   [num_node]              generation of the evaluation
+#   parents : int64   [num_node, max_parents] node id of the crossover parents, -1 for roots
+#                                              (random initialization, restart, migrants)
+#   fit     : float64 [num_node]
+#   row     : int64   [num_node]              row of the parameters in lineage_params.bin (-1 if not kept)
+#   origin  : int64   [num_node]              tag of the root (island id), inherited from the first parent
+# The first parent is the main one (x_pick of PCX), so following it gives a single line of descent.
+# New nodes are appended to lineage_<field>.bin in log_dir by flush, lineage.json keeps the number of nodes.
+
+META_NAME = "lineage.json"
+FIELDS = {"job": np.int64, "clock": np.int64, "parents": np.int64, "fit": np.float64, "row": np.int64,
+          "origin": np.int64}
+
+
+def get_fname(log_dir, field):
+    return os.path.join(log_dir, "lineage_%s.bin"%(field))
+
+
+def is_lineage(log_dir):
+    return os.path.exists(os.path.join(log_dir, META_NAME))
+
+
+class Lineage:
+    def __init__(self, max_parents, num_params=None, log_dir=None, keep_params=False, chunk_size=4096):
+        self.max_parents = int(max_parents)
+        self.num_params = num_params
+        self.log_dir = log_dir
+        self.keep_params = keep_params
+        self.chunk_size = int(chunk_size)
+        if keep_params and num_params is None:
+            raise ValueError("num_params is required to keep the parameters")
+
+        self.num_node = 0
+        self.num_row = 0
+        self.num_flushed = 0
+        self.capacity = 0
+        self.data = {field: self.empty(field, 0) for field in FIELDS}
+        self.params = np.zeros([0, num_params if keep_params else 0])
+        # job id -> latest node
+        self.job_index = np.zeros(0, dtype=np.int64)
+
+        if log_dir is not None and is_lineage(log_dir):
+            self.read(log_dir)
+
+    def empty(self, field, num):
+        if field == "parents":
+            return np.ones([num, self.max_parents], dtype=FIELDS[field]) * (-1)
+        return np.zeros(num, dtype=FIELDS[field])
+
+    def grow(self, num_node):
+        # preallocate by chunk
+        capacity = int(np.ceil(num_node / self.chunk_size) * self.chunk_size)
+        for field in FIELDS:
+            arr = self.empty(field, capacity)
+            arr[:self.num_node] = self.data[field][:self.num_node]
+            self.data[field] = arr
+        # a node keeps at most one row of the parameters, so the rows share the capacity
+        params = np.zeros([capacity, self.params.shape[1]])
+        params[:self.num_row] = self.params[:self.num_row]
+        self.params = params
+        self.capacity = capacity
+
+    def __getattr__(self, name):
+        # written part of each field (lineage.parents, lineage.fit, ...)
+        data = self.__dict__.get("data")
+        if data is not None and name in data:
+            return data[name][:self.num_node]
+        raise AttributeError(name)
+
+    def append(self, job_ids, clock, parents, fitness, params=None, origin=0):
+        """
+        Add the nodes of job_ids, returns their node id
+        parents: [num_job, <=max_parents] node id of the parents, None for roots
+        params: [num_params, num_job], saved only with keep_params
+        origin: tag of the roots, the others inherit the origin of their first parent
+        """
+        job_ids = np.asarray(job_ids, dtype=np.int64)
+        num_job = len(job_ids)
+        n0, n1 = self.num_node, self.num_node + num_job
+        if n1 > self.capacity:
+            self.grow(n1)
+
+        node_parents = self.empty("parents", num_job)
+        if parents is not None:
+            parents = np.asarray(parents, dtype=np.int64).reshape(num_job, -1)
+            node_parents[:, :parents.shape[1]] = parents
+
+        is_root = node_parents[:, 0] < 0
+        node_origin = np.broadcast_to(np.asarray(origin, dtype=np.int64), (num_job,)).copy()
+        node_origin[~is_root] = self.data["origin"][node_parents[~is_root, 0]]
+
+        self.data["job"][n0:n1] = job_ids
+        self.data["clock"][n0:n1] = clock
+        self.data["parents"][n0:n1] = node_parents
+        self.data["fit"][n0:n1] = fitness
+        self.data["origin"][n0:n1] = node_origin
+        if self.keep_params and params is not None:
+            self.params[self.num_row:self.num_row+num_job] = np.asarray(params, dtype=float).T
+            self.data["row"][n0:n1] = self.num_row + np.arange(num_job)
+            self.num_row += num_job
+        else:
+            self.data["row"][n0:n1] = -1
+        self.num_node = n1
+
+        # index of job id, migrants (-1) are not indexed
+        valid = job_ids >= 0
+        if np.any(valid):
+            max_job = np.max(job_ids[valid]) + 1
+            if max_job > len(self.job_index):
+                job_index = np.ones(max(max_job, 2*len(self.job_index)), dtype=np.int64) * (-1)
+                job_index[:len(self.job_index)] = self.job_index
+                self.job_index = job_index
+            self.job_index[job_ids[valid]] = np.arange(n0, n1)[valid]
+
+        return np.arange(n0, n1)
+
+    def find(self, job_ids):
+        # latest node of each job id, -1 if not recorded
+        job_ids = np.asarray(job_ids, dtype=np.int64)
+        nodes = np.ones(job_ids.shape, dtype=np.int64) * (-1)
+        valid = (job_ids >= 0) & (job_ids < len(self.job_index))
+        nodes[valid] = self.job_index[job_ids[valid]]
+        return nodes
+
+    def line(self, node):
+        # line of descent through the first parent, [node, parent, grand parent, ..., root]
+        out = [int(node)]
+        while self.data["parents"][out[-1], 0] >= 0:
+            out.append(int(self.data["parents"][out[-1], 0]))
+        return np.array(out, dtype=np.int64)
+
+    def ancestors(self, nodes, max_depth=None):
+        # every ancestor of nodes (all crossover parents), one numpy step per generation of depth
+        found = np.zeros(0, dtype=np.int64)
+        frontier = np.unique(np.atleast_1d(np.asarray(nodes, dtype=np.int64)))
+        depth = 0
+        while len(frontier) > 0 and (max_depth is None or depth < max_depth):
+            frontier = self.data["parents"][frontier].ravel()
+            frontier = np.setdiff1d(frontier[frontier >= 0], found)
+            found = np.union1d(found, frontier)
+            depth += 1
+        return found
+
+    def roots(self, nodes):
+        # root of the line of descent of each node
+        nodes = np.array(nodes, dtype=np.int64)
+        parent = self.data["parents"][nodes, 0]
+        while np.any(parent >= 0):
+            nodes = np.where(parent >= 0, parent, nodes)
+            parent = self.data["parents"][nodes, 0]
+        return nodes
+
+    def depth(self, nodes):
+        # number of generations of crossover to the root
+        nodes = np.array(nodes, dtype=np.int64)
+        depth = np.zeros(nodes.shape, dtype=np.int64)
+        parent = self.data["parents"][nodes, 0]
+        while np.any(parent >= 0):
+            depth += parent >= 0
+            nodes = np.where(parent >= 0, parent, nodes)
+            parent = self.data["parents"][nodes, 0]
+        return depth
+
+    def get_params(self, nodes):
+        # [num_params, K], nan for the nodes without saved parameters
+        rows = self.data["row"][np.asarray(nodes, dtype=np.int64)]
+        params = np.ones([len(rows), self.params.shape[1]]) * np.nan
+        params[rows >= 0] = self.params[rows[rows >= 0]]
+        return params.T
+
+    def export(self, fname=None):
+        # copy of all fields, saved as npz if fname is given
+        out = {field: self.data[field][:self.num_node].copy() for field in FIELDS}
+        if self.keep_params:
+            out["params"] = self.params[:self.num_row].copy()
+        if fname is not None:
+            np.savez(fname, **out)
+        return out
+
+    def flush(self):
+        # append the nodes added after the last flush
+        if self.log_dir is None or self.num_flushed == self.num_node:
+            return
+
+        n0, n1 = self.num_flushed, self.num_node
+        for field in FIELDS:
+            with open(get_fname(self.log_dir, field), "ab") as fid:
+                fid.write(self.data[field][n0:n1].tobytes())
+        if self.keep_params:
+            with open(get_fname(self.log_dir, "params"), "ab") as fid:
+                rows = self.data["row"][n0:n1]
+                fid.write(self.params[rows[rows >= 0]].tobytes())
+
+        self.num_flushed = n1
+        self.write_meta()
+
+    def write_meta(self):
+        meta = {"num_node": int(self.num_flushed), "num_row": int(self.num_row), "max_parents": self.max_parents,
+                "num_params": self.num_params, "keep_params": self.keep_params}
+        fname = os.path.join(self.log_dir, META_NAME)
+        with open(fname + ".tmp", "w") as fid:
+            json.dump(meta, fid)
+        os.replace(fname + ".tmp", fname)
+
+    def read(self, log_dir):
+        # continue the lineage written in log_dir, the nodes after lineage.json are dropped
+        with open(os.path.join(log_dir, META_NAME), "r") as fid:
+            meta = json.load(fid)
+        if meta["max_parents"] != self.max_parents:
+            raise ValueError("The lineage in %s has %d parents per node, current %d"%(
+                log_dir, meta["max_parents"], self.max_parents))
+
+        num_node = meta["num_node"]
+        self.grow(num_node)
+        for field, dtype in FIELDS.items():
+            shape = (num_node, self.max_parents) if field == "parents" else (num_node,)
+            self.data[field][:num_node] = np.fromfile(get_fname(log_dir, field), dtype=dtype,
+                                                      count=int(np.prod(shape))).reshape(shape)
+        self.num_node = num_node
+        self.num_flushed = num_node
+
+        if self.keep_params and meta["keep_params"]:
+            self.num_row = meta["num_row"]
+            self.params[:self.num_row] = np.fromfile(get_fname(log_dir, "params"), dtype=np.float64,
+                                                     count=self.num_row*self.num_params).reshape(self.num_row, self.num_params)
+        else:
+            self.data["row"][:num_node] = -1
+
+        jobs = self.data["job"][:num_node]
+        valid = jobs >= 0
+        self.job_index = np.ones(np.max(jobs[valid])+1 if np.any(valid) else 0, dtype=np.int64) * (-1)
+        self.job_index[jobs[valid]] = np.where(valid)[0]
+        self.truncate_files()
+
+    def truncate(self, num_node):
+        # drop the nodes after num_node (load_checkpoint)
+        if num_node >= self.num_node:
+            return
+        jobs = self.data["job"][num_node:self.num_node]
+        self.job_index[jobs[jobs >= 0]] = -1
+        rows = self.data["row"][num_node:self.num_node]
+        if np.any(rows >= 0):
+            self.num_row = int(np.min(rows[rows >= 0]))
+        self.num_node = num_node
+        self.num_flushed = min(self.num_flushed, num_node)
+        # job ids of the dropped nodes point to the previous nodes of the same job id
+        valid = self.data["job"][:num_node] >= 0
+        self.job_index[self.data["job"][:num_node][valid]] = np.where(valid)[0]
+        if self.log_dir is not None and is_lineage(self.log_dir):
+            self.truncate_files()
+            self.write_meta()
+
+    def truncate_files(self):
+        for field, dtype in FIELDS.items():
+            row_size = np.dtype(dtype).itemsize * (self.max_parents if field == "parents" else 1)
+            os.truncate(get_fname(self.log_dir, field), self.num_flushed * row_size)
+        if self.keep_params and os.path.exists(get_fname(self.log_dir, "params")):
+            rows = self.data["row"][:self.num_flushed]
+            num_row = int(np.max(rows) + 1) if np.any(rows >= 0) else 0
+            os.truncate(get_fname(self.log_dir, "params"), num_row * self.num_params * 8)
@@ -1,53 +1,224 @@
-import matplotlib.pyplot as plt
 import pickle as pkl
 import os
-import numpy as np 
+import numpy as np
+from . import history
+
+
+INDEX_NAME = "log_index.npy"
+# objectives of the multi-objective EA (text log), and its line-offset index
+OBJ_LOG_NAME = "objectives.txt"
+OBJ_INDEX_NAME = "objectives_index.npy"
 
 
 class Logger:
+    """
+    Read the log written by EA.print_log (log.txt + params_N.pkl, or the binary history)
+    fit_scores and job_ids load the whole log on first access.
+    For long runs, use iter_generations / aggregate / get_generation, which read the log
+    by chunk or through the line-offset index (log_index.npy) without keeping it in memory
+    """
     def __init__(self, parent_dir):
         self.parent_dir = parent_dir
         self._read_log()
         self.load_param_id = -1
-        
+
     def _read_log(self):
-        self.fit_scores, self.job_ids = read_log(os.path.join(self.parent_dir, "log.txt"))
-    
+        # binary history (log_format="binary") is memmapped, generations are zero-copy slices
+        self.is_binary = history.is_history(self.parent_dir)
+        self._fit_scores = None
+        self._job_ids = None
+        self._index = None
+        if self.is_binary:
+            self.history = history.HistoryReader(self.parent_dir)
+            self._fit_scores = self.history.fit_scores
+            self._job_ids = self.history.job_ids
+        self.log_fname = os.path.join(self.parent_dir, "log.txt")
+
+    @property
+    def fit_scores(self):
+        if self._fit_scores is None:
+            self._fit_scores, self._job_ids = read_log(self.log_fname)
+        return self._fit_scores
+
+    @property
+    def job_ids(self):
+        if self._job_ids is None:
+            self._fit_scores, self._job_ids = read_log(self.log_fname)
+        return self._job_ids
+
+    @property
+    def num_generations(self):
+        if self.is_binary:
+            return self.history.num_gen
+        return len(self.get_index()) - 1
+
+    def get_index(self):
+        # offset of each line in log.txt, the last element is the end of the last line
+        if self._index is None:
+            self._index = build_index(self.log_fname, os.path.join(self.parent_dir, INDEX_NAME))
+        return self._index
+
+    def get_generation(self, n):
+        # fitness and job id of n-th generation (negative n counts from the end)
+        if self.is_binary:
+            return self.history.fit_scores[n], self.history.job_ids[n]
+
+        index = self.get_index()
+        n = range(len(index)-1)[n]
+        with open(self.log_fname, "rb") as fid:
+            fid.seek(index[n])
+            line = fid.read(index[n+1] - index[n]).decode()
+        fit_scores, job_ids = parse_lines(line)
+        return fit_scores[0], job_ids[0]
+
+    def get_objectives(self, n):
+        # objectives [num_parent, num_objectives] and job id of n-th generation, written by multi-objective EA
+        if self.is_binary:
+            if self.history.objectives is None:
+                raise ValueError("There is no objectives in %s"%(self.parent_dir))
+            return self.history.objectives[n], self.history.job_ids[n]
+
+        fname = os.path.join(self.parent_dir, OBJ_LOG_NAME)
+        if not os.path.exists(fname):
+            raise ValueError("There is no objectives in %s"%(self.parent_dir))
+        index = build_index(fname, os.path.join(self.parent_dir, OBJ_INDEX_NAME))
+        n = range(len(index)-1)[n]
+        with open(fname, "rb") as fid:
+            fid.seek(index[n])
+            line = fid.read(index[n+1] - index[n]).decode()
+        return parse_objectives(line)
+
+    def get_pareto_front(self, n=-1):
+        # objectives and job id of the non-dominated parents of n-th generation
+        from .pareto import get_front
+        objectives, job_ids = self.get_objectives(n)
+        id_front = get_front(objectives)
+        return np.asarray(objectives)[id_front], np.asarray(job_ids)[id_front]
+
+    def iter_generations(self, chunk_size=1000, nstart=0):
+        # yield (fit_scores, job_ids) of chunk_size generations, [num_gen, num_parent]
+        if self.is_binary:
+            for n0 in range(nstart, self.history.num_gen, chunk_size):
+                yield self.history.fit_scores[n0:n0+chunk_size], self.history.job_ids[n0:n0+chunk_size]
+            return
+
+        index = self.get_index()
+        with open(self.log_fname, "rb") as fid:
+            for n0 in range(nstart, len(index)-1, chunk_size):
+                n1 = min(n0 + chunk_size, len(index)-1)
+                fid.seek(index[n0])
+                yield parse_lines(fid.read(index[n1] - index[n0]).decode())
+
+    def aggregate(self, chunk_size=1000):
+        # mean / max / min fitness of each generation and the best fitness so far, in one pass
+        out = {"mean": [], "max": [], "min": [], "best": []}
+        best = -np.inf
+        for fit_scores, _ in self.iter_generations(chunk_size):
+            fmax = np.nanmax(fit_scores, axis=1)
+            out["mean"].append(np.nanmean(fit_scores, axis=1))
+            out["max"].append(fmax)
+            out["min"].append(np.nanmin(fit_scores, axis=1))
+            out["best"].append(np.fmax.accumulate(np.concatenate([[best], fmax]))[1:])
+            best = out["best"][-1][-1] if len(fmax) > 0 else best
+        for key in out:
+            out[key] = np.concatenate(out[key]) if len(out[key]) > 0 else np.zeros(0)
+        return out
+
     def view_log(self, nstart=0, f=np.average):
-        s = f(self.fit_scores, axis=1)
-        
+        # f is applied to each chunk of generations
+        s = np.concatenate([f(fit_scores, axis=1) for fit_scores, _ in self.iter_generations(nstart=nstart)])
+
+        import matplotlib.pyplot as plt
         plt.figure(dpi=120, figsize=(4,4))
-        plt.plot(s[nstart:], 'k.-')
+        plt.plot(s, 'k.-')
         plt.xlabel("epoch", fontsize=20)
         plt.ylabel("fitness", fontsize=20)
         plt.show()
 
-        print(len(s))
-        
+        print(len(s) + nstart)
+
     def load_params(self, param_id):
-        nlog = len(self.fit_scores)
-        if param_id >= nlog:
+        # objective_set is None unless the log is written by multi-objective EA
+        if self.is_binary:
+            # param_id is the clock as params_N.pkl
+            n = self.history.find_generation(param_id)
+            self.job_id_set = self.history.job_ids[n]
+            self.param_set = self.history.params[n]
+            self.objective_set = None if self.history.objectives is None else self.history.objectives[n]
+            self.load_param_id = param_id
+            return
+
+        # params_N.pkl is saved with the N-th line of log.txt (N = 1, 2, ...)
+        nlog = self.num_generations
+        if param_id > nlog:
             print("param_id exceeds nlogs: %d"%(nlog))
-        
+
         with open(os.path.join(self.parent_dir, "params_%d.pkl"%(param_id)), "rb") as fid:
             data = pkl.load(fid)
             self.job_id_set = data["job_id"]
             self.param_set = data["params"]
-            
+            self.objective_set = data.get("objectives")
+
         self.load_param_id = param_id
-            
+
 
 def read_log(log_fname):
-    fit_scores = []
-    job_ids = []
     with open(log_fname, "r") as fid:
-        line = fid.readline()
-        while line:
-            fit_scores.append([])
-            job_ids.append([])
-            for tmp in line.split(",")[:-1]:
-                p = tmp.split(":")
-                fit_scores[-1].append(float(p[1]))
-                job_ids[-1].append(int(p[0]))
-            line = fid.readline()
-    return fit_scores, job_ids
\ No newline at end of file
+        return parse_lines(fid.read())
+
+
+def parse_lines(text):
+    # "id:score,id:score,...,\n" lines -> fit_scores [num_gen, num_parent], job_ids [num_gen, num_parent]
+    lines = text.splitlines()
+    if len(lines) == 0:
+        return np.zeros([0, 0]), np.zeros([0, 0], dtype=int)
+
+    tokens = "".join(lines).replace(":", ",").split(",")[:-1]
+    try:
+        data = np.array(tokens, dtype=float).reshape(len(lines), -1, 2)
+    except ValueError:
+        # lines with different number of parents
+        data = [np.array(line.replace(":", ",").split(",")[:-1], dtype=float).reshape(-1, 2) for line in lines]
+        return [d[:, 1] for d in data], [d[:, 0].astype(int) for d in data]
+    return data[:, :, 1], data[:, :, 0].astype(int)
+
+
+def parse_objectives(line):
+    # "id:obj1;obj2;...,id:obj1;obj2;...,\n" -> objectives [num_parent, num_objectives], job_ids [num_parent]
+    items = line.strip().split(",")[:-1]
+    job_ids = np.array([item.split(":")[0] for item in items], dtype=int)
+    objectives = np.array([item.split(":")[1].split(";") for item in items], dtype=float)
+    return objectives, job_ids
+
+
+def build_index(log_fname, index_fname=None, block_size=1<<24):
+    # line offsets of log.txt, cached in index_fname and extended when the log grows
+    index = np.zeros(1, dtype=np.int64)
+    if index_fname is not None and os.path.exists(index_fname):
+        index = np.load(index_fname)
+        size = os.path.getsize(log_fname)
+        if index[-1] > size or (index[-1] > 0 and not is_line_end(log_fname, index[-1])):
+            # the log is truncated (load_checkpoint) or rewritten
+            index = np.zeros(1, dtype=np.int64)
+
+    offsets = [index]
+    with open(log_fname, "rb") as fid:
+        fid.seek(index[-1])
+        pos = index[-1]
+        while True:
+            block = fid.read(block_size)
+            if len(block) == 0:
+                break
+            offsets.append(pos + np.where(np.frombuffer(block, dtype=np.uint8) == ord("\n"))[0] + 1)
+            pos += len(block)
+    index = np.concatenate(offsets)
+
+    if index_fname is not None:
+        np.save(index_fname, index)
+    return index
+
+
+def is_line_end(log_fname, offset):
+    with open(log_fname, "rb") as fid:
+        fid.seek(offset-1)
+        return fid.read(1) == b"\n"
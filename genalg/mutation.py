@@ -0,0 +1,95 @@
+import numpy as np
+from ._kernels import perturb_clip
+
+
+# Mutation operators of EA.mutate
+# Each gene of the offspring mutates with probability rate. Instead of drawing one number per gene,
+# the number of mutated genes is drawn from the binomial distribution and their positions are sampled,
+# so the cost is proportional to the number of mutations.
+# perturb(x, pmin, pmax, rng) returns the mutated values of the genes x (pmin, pmax: bounds of each gene)
+# update(num_success, num_child) is called after the selection (used by the adaptive operator)
+# with the mutated offspring only: num_child mutated, num_success of them survived
+
+
+class GaussianMutation:
+    # x + N(0, sigma*(pmax-pmin)), clipped to the boundary
+    def __init__(self, sigma=0.2):
+        self.sigma = sigma
+
+    def perturb(self, x, pmin, pmax, rng):
+        return perturb_clip(x, rng.standard_normal(len(x)) * self.sigma, pmin, pmax)
+
+    def update(self, num_success, num_child):
+        pass
+
+
+class PolynomialMutation(GaussianMutation):
+    # polynomial mutation (K. Deb & M. Goyal, 1996), stays in the boundary without clipping
+    def __init__(self, eta=20):
+        self.eta = eta
+
+    def perturb(self, x, pmin, pmax, rng):
+        scale = pmax - pmin
+        scale = np.where(scale == 0, 1, scale)
+        d1 = (x - pmin) / scale
+        d2 = (pmax - x) / scale
+        u = rng.random(len(x))
+        p = 1 / (self.eta + 1)
+        is_low = u < 0.5
+        dq = np.empty(len(x))
+        dq[is_low] = (2*u[is_low] + (1 - 2*u[is_low]) * (1 - d1[is_low])**(self.eta+1))**p - 1
+        dq[~is_low] = 1 - (2*(1 - u[~is_low]) + 2*(u[~is_low] - 0.5) * (1 - d2[~is_low])**(self.eta+1))**p
+        return np.clip(x + dq * (pmax - pmin), pmin, pmax)
+
+
+class CauchyMutation(GaussianMutation):
+    # heavy-tailed jumps, x + scale*(pmax-pmin)*Cauchy, clipped to the boundary
+    def __init__(self, scale=0.05):
+        self.scale = scale
+
+    def perturb(self, x, pmin, pmax, rng):
+        return perturb_clip(x, rng.standard_cauchy(len(x)) * self.scale, pmin, pmax)
+
+
+class AdaptiveMutation(GaussianMutation):
+    # Gaussian with sigma adapted by the 1/5 success rule (I. Rechenberg, 1973)
+    # sigma grows when more than target of the mutated offspring survive, and shrinks otherwise
+    def __init__(self, sigma=0.2, target=0.2, factor=1.22, sigma_min=1e-4, sigma_max=1):
+        self.sigma = sigma
+        self.target = target
+        self.factor = factor
+        self.sigma_min = sigma_min
+        self.sigma_max = sigma_max
+
+    def update(self, num_success, num_child):
+        if num_child == 0:
+            return
+        if num_success / num_child > self.target:
+            self.sigma *= self.factor
+        else:
+            self.sigma /= self.factor
+        self.sigma = float(np.clip(self.sigma, self.sigma_min, self.sigma_max))
+
+
+MUTATIONS = {"gaussian": GaussianMutation, "polynomial": PolynomialMutation, "cauchy": CauchyMutation,
+             "adaptive": AdaptiveMutation}
+
+
+def sample_positions(shape, rate, rng):
+    # (row, column) of the mutated genes, each gene is picked with probability rate
+    size = int(np.prod(shape))
+    num = rng.binomial(size, rate)
+    if num == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    return np.unravel_index(rng.choice(size, num, replace=False), shape)
+
+
+def mutate(offspring, pmin, pmax, rate, operator, rng=np.random):
+    # offspring: [num_params, num_child], mutated in place
+    # returns offspring and the mask of the mutated columns
+    i, n = sample_positions(offspring.shape, rate, rng)
+    is_mutated = np.zeros(offspring.shape[1], dtype=bool)
+    if len(i) > 0:
+        offspring[i, n] = operator.perturb(offspring[i, n], pmin[i], pmax[i], rng)
+        is_mutated[n] = True
+    return offspring, is_mutated
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+# Multi-objective selection (NSGA-II, K. Deb et al., IEEE Trans. Evol. Comput., 2002)
+# objectives: [num_individual, num_objectives], every objective is maximized like the fitness of EA
+# An individual with a NaN objective is put after the last front, so it is never selected
+# unless there are not enough valid candidates
+
+
+def dominance_matrix(objectives):
+    # dom[i, j]: i dominates j (not worse in every objective and better in at least one)
+    num = len(objectives)
+    ge = np.ones([num, num], dtype=bool)
+    gt = np.zeros([num, num], dtype=bool)
+    for m in range(objectives.shape[1]):
+        f = objectives[:, m]
+        ge &= f[:, None] >= f[None, :]
+        gt |= f[:, None] > f[None, :]
+    return ge & gt
+
+
+def non_dominated_sort(objectives):
+    """
+    Pareto rank of each individual (0: non-dominated front), O(M N^2)
+    The front is peeled off by updating the number of dominating individuals with the rows of the
+    dominance matrix, so each pair is visited once
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    rank = np.zeros(len(objectives), dtype=np.int64)
+    is_valid = ~np.any(np.isnan(objectives), axis=1)
+    id_valid = np.where(is_valid)[0]
+
+    dom = dominance_matrix(objectives[id_valid])
+    num_dom = np.sum(dom, axis=0)
+    remain = np.ones(len(id_valid), dtype=bool)
+    r = 0
+    while np.any(remain):
+        front = remain & (num_dom == 0)
+        rank[id_valid[front]] = r
+        remain &= ~front
+        num_dom -= np.sum(dom[front], axis=0)
+        r += 1
+    rank[~is_valid] = r
+    return rank
+
+
+def crowding_distance(objectives, rank):
+    # distance between the neighbors in each front, summed over the objectives (normalized by the range)
+    # the boundary individuals of a front get inf, invalid individuals get 0
+    objectives = np.asarray(objectives, dtype=float)
+    dist = np.zeros(len(objectives))
+    is_valid = ~np.any(np.isnan(objectives), axis=1)
+    for r in np.unique(rank[is_valid]):
+        ids = np.where((rank == r) & is_valid)[0]
+        if len(ids) <= 2:
+            dist[ids] = np.inf
+            continue
+        f = objectives[ids]
+        for m in range(f.shape[1]):
+            order = np.argsort(f[:, m], kind="stable")
+            span = f[order[-1], m] - f[order[0], m]
+            if span > 0:
+                dist[ids[order[1:-1]]] += (f[order[2:], m] - f[order[:-2], m]) / span
+            dist[ids[order[[0, -1]]]] = np.inf
+    return dist
+
+
+def select_nsga2(objectives, num_select):
+    # fronts are taken in order, the last front that does not fit is cut by crowding distance (larger first)
+    # returns the sorted index of the survivors and the rank of every individual
+    objectives = np.asarray(objectives, dtype=float)
+    rank = non_dominated_sort(objectives)
+    dist = crowding_distance(objectives, rank)
+    order = np.lexsort((-dist, rank))
+    return np.sort(order[:num_select]), rank
+
+
+def get_front(objectives):
+    # index of the non-dominated individuals
+    objectives = np.asarray(objectives, dtype=float)
+    if len(objectives) == 0:
+        return np.zeros(0, dtype=np.int64)
+    rank = non_dominated_sort(objectives)
+    return np.where((rank == 0) & ~np.any(np.isnan(objectives), axis=1))[0]
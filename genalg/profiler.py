@@ -0,0 +1,96 @@
+import numpy as np
+import contextlib
+import json
+import time
+
+
+# Per-phase timing of EA, enabled with EA.enable_profiling
+# One record is made for each generation:
+#   {"clock", "phase": {name: [wall, cpu]}, "latency": {"p50", "p95", "max", "num"},
+#    "utilization", "bytes_written", "failed"}
+# cpu time is measured in the main process only
+
+NULL_PHASE = contextlib.nullcontext()
+
+
+class Profiler:
+    def __init__(self):
+        self.records = []
+        self.stack = []
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.latency = []
+        self.eval_wall = 0
+        self.num_workers = 1
+        self.num_failed = 0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        # nested phase is excluded from the time of the outer phase
+        t0, c0 = time.perf_counter(), time.process_time()
+        self.stack.append(name)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+            self.add_phase(name, wall, cpu)
+            if len(self.stack) > 0:
+                self.add_phase(self.stack[-1], -wall, -cpu)
+
+    def add_phase(self, name, wall, cpu):
+        if name in self.phases:
+            self.phases[name][0] += wall
+            self.phases[name][1] += cpu
+        else:
+            self.phases[name] = [wall, cpu]
+
+    def add_evaluation(self, latency, wall, num_workers, num_failed=0):
+        self.latency.extend(latency)
+        self.eval_wall += wall
+        self.num_workers = num_workers
+        self.num_failed += num_failed
+
+    def end_generation(self, clock):
+        rec = {"clock": int(clock), "phase": self.phases, "bytes_written": 0, "failed": self.num_failed}
+        if len(self.latency) > 0:
+            lat = np.array(self.latency)
+            rec["latency"] = {"p50": float(np.percentile(lat, 50)), "p95": float(np.percentile(lat, 95)),
+                              "max": float(np.max(lat)), "num": len(lat)}
+            if self.eval_wall > 0:
+                rec["utilization"] = float(np.sum(lat) / (self.eval_wall * self.num_workers))
+        self.records.append(rec)
+        self.reset()
+        return rec
+
+    def add_log(self, clock, wall, cpu, num_bytes):
+        # print_log runs after the generation is closed
+        if len(self.records) > 0 and self.records[-1]["clock"] == clock:
+            rec = self.records[-1]
+            rec["phase"]["log"] = [wall, cpu]
+            rec["bytes_written"] += int(num_bytes)
+
+    def export(self, fname):
+        # append the records to jsonl file, and clear them
+        with open(fname, "a") as fid:
+            for rec in self.records:
+                fid.write(json.dumps(rec) + "\n")
+        self.records = []
+
+
+class TimedCall:
+    # wrap object function to measure the latency in the worker
+    def __init__(self, fobj):
+        self.fobj = fobj
+
+    def __call__(self, arg):
+        t0 = time.perf_counter()
+        res = self.fobj(arg)
+        return res, time.perf_counter() - t0
+
+
+def read_metrics(fname):
+    with open(fname, "r") as fid:
+        return [json.loads(line) for line in fid]
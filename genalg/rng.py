@@ -0,0 +1,120 @@
+import numpy as np
+
+
+# Random number streams of EA
+# EA owns a RandomBuffer (numpy Generator), the global np.random state is not used.
+# Uniform and normal numbers are drawn by block, and the scalar / small draws of the
+# per-offspring operators are served from the block (the Generator call overhead is paid once per block).
+# The blocks are consumed to the end, so the same seed gives the same sequence regardless of how the
+# draws are split (random(4000) + random(200) is random(4200)).
+
+
+class RandomBuffer:
+    def __init__(self, seed=None, block_size=4096):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_seq = seed
+        else:
+            self.seed_seq = np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seed_seq)
+        self.block_size = int(block_size)
+        self._uniform = np.zeros(0)
+        self._normal = np.zeros(0)
+        self._pos_uniform = 0
+        self._pos_normal = 0
+
+    def random(self, size=None):
+        # uniform [0, 1)
+        out, self._uniform, self._pos_uniform = self.draw(self.generator.random, self._uniform,
+                                                          self._pos_uniform, size)
+        return out
+
+    def standard_normal(self, size=None):
+        out, self._normal, self._pos_normal = self.draw(self.generator.standard_normal, self._normal,
+                                                        self._pos_normal, size)
+        return out
+
+    def draw(self, fn, block, pos, size):
+        # returns the values, the block and the position after the draw
+        num = get_num(size)
+        if pos + num <= len(block):
+            out = block[pos:pos+num]
+            pos += num
+        else:
+            # the rest of the block is used first, then whole blocks are drawn
+            rest = block[pos:]
+            pos = num - len(rest)
+            num_block = -(-pos // self.block_size)
+            block = fn(num_block * self.block_size)
+            out = np.concatenate([rest, block[:pos]])
+            # only the last block is kept
+            block = block[(num_block-1)*self.block_size:].copy()
+            pos -= (num_block-1)*self.block_size
+        if size is None:
+            return float(out[0]), block, pos
+        return out.reshape(size), block, pos
+
+    def uniform(self, low=0, high=1, size=None):
+        if size is None:
+            size = np.broadcast(np.asarray(low), np.asarray(high)).shape
+            if size == ():
+                size = None
+        return low + (high - low) * self.random(size)
+
+    def choice(self, a, size=None, replace=True, p=None):
+        return self.generator.choice(a, size, replace=replace, p=p)
+
+    def binomial(self, n, p, size=None):
+        return self.generator.binomial(n, p, size)
+
+    def standard_cauchy(self, size=None):
+        return self.generator.standard_cauchy(size)
+
+    def integers(self, low, high=None, size=None):
+        return self.generator.integers(low, high, size)
+
+    def permutation(self, x):
+        return self.generator.permutation(x)
+
+    def spawn(self, num):
+        # independent child streams (islands, sweep runs)
+        return [RandomBuffer(s, self.block_size) for s in self.seed_seq.spawn(num)]
+
+
+def get_num(size):
+    if size is None:
+        return 1
+    if isinstance(size, (int, np.integer)):
+        return int(size)
+    num = 1
+    for n in size:
+        num *= int(n)
+    return num
+
+
+def get_seed_seq(seed):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if seed is None:
+        # follow the legacy global state, np.random.seed(n) before creating EA still fixes the run
+        seed = int(np.random.randint(2**31))
+    return np.random.SeedSequence(seed)
+
+
+# first word of the spawn key of the job streams, not reached by SeedSequence.spawn
+JOB_KEY = 0xFFFFFFFF
+
+
+def job_rng(seed_seq, job_id):
+    # stream of one job, the same whichever worker evaluates it
+    key = seed_seq.spawn_key + (JOB_KEY, int(job_id))
+    return np.random.default_rng(np.random.SeedSequence(seed_seq.entropy, spawn_key=key))
+
+
+def seed_worker(seed_seq, counter):
+    # Pool initializer: each worker gets its own child stream for the global np.random state
+    # (forked workers would otherwise share the parent state)
+    with counter.get_lock():
+        num = counter.value
+        counter.value += 1
+    child = np.random.SeedSequence(seed_seq.entropy, spawn_key=seed_seq.spawn_key + (num,))
+    np.random.seed(child.generate_state(4))
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+# Survivor selection strategies for EA.natural_selection
+# select_xxx(fitness, num_select, num_elite) returns the sorted index of the survivors in fitness
+# NaN fitness is never selected unless there are not enough valid candidates
+# rng: numpy Generator or genalg.rng.RandomBuffer (np.random module by default)
+
+
+def select_roulette(fitness, num_select, num_elite=2, rng=np.random):
+    # the best num_elite survive, the others are picked with probability proportional to (fitness - min)
+    id_elite, id_rest = split_elite(fitness, num_elite)
+    w = fitness[id_rest] - np.min(fitness[id_rest]) if len(id_rest) > 0 else np.zeros(0)
+    return finish(fitness, num_select, id_elite, id_rest[sample_weighted(w, num_select - len(id_elite), rng)], rng)
+
+
+def select_rank(fitness, num_select, num_elite=2, rng=np.random):
+    # linear ranking, the worst has weight 1 and the best one has the largest weight
+    id_elite, id_rest = split_elite(fitness, num_elite)
+    w = np.empty(len(id_rest))
+    w[np.argsort(fitness[id_rest])] = np.arange(1, len(id_rest)+1)
+    return finish(fitness, num_select, id_elite, id_rest[sample_weighted(w, num_select - len(id_elite), rng)], rng)
+
+
+def select_elitist(fitness, num_select, num_elite=2, rng=np.random):
+    id_elite, _ = split_elite(fitness, num_select)
+    return finish(fitness, num_select, id_elite, np.zeros(0, dtype=int), rng)
+
+
+def select_tournament(fitness, num_select, num_elite=2, rng=np.random, size=2):
+    # repeat tournament of size candidates among the remaining ones
+    id_elite, id_rest = split_elite(fitness, num_elite)
+    num_pick = min(num_select - len(id_elite), len(id_rest))
+    remain = np.ones(len(id_rest), dtype=bool)
+    id_pick = []
+    for n in range(num_pick):
+        id_remain = np.where(remain)[0]
+        cand = rng.choice(id_remain, min(size, len(id_remain)), replace=False)
+        nid = cand[np.argmax(fitness[id_rest[cand]])]
+        remain[nid] = False
+        id_pick.append(nid)
+    return finish(fitness, num_select, id_elite, id_rest[np.array(id_pick, dtype=int)], rng)
+
+
+STRATEGIES = {"roulette": select_roulette, "rank": select_rank, "elitist": select_elitist,
+              "tournament": select_tournament}
+
+
+def select(strategy, fitness, num_select, num_elite=2, rng=np.random):
+    if strategy not in STRATEGIES:
+        raise ValueError("Selection need to be one of %s, selected %s"%(list(STRATEGIES), strategy))
+    return STRATEGIES[strategy](np.asarray(fitness, dtype=float), num_select, num_elite, rng)
+
+
+def split_elite(fitness, num_elite):
+    # best num_elite among the valid (not NaN) fitness, and the other valid index
+    id_valid = np.where(~np.isnan(fitness))[0]
+    num_elite = min(num_elite, len(id_valid))
+    id_sort = id_valid[np.argsort(fitness[id_valid], kind="stable")[::-1]]
+    return id_sort[:num_elite], np.sort(id_sort[num_elite:])
+
+
+def sample_weighted(w, num_pick, rng=np.random):
+    # weighted sampling without replacement (Efraimidis & Spirakis, 2006), O(n)
+    # same distribution as repeating roulette wheel and removing the picked one
+    num_pick = min(num_pick, len(w))
+    if num_pick <= 0:
+        return np.zeros(0, dtype=int)
+    if np.sum(w) <= 0:
+        w = np.ones(len(w))
+
+    with np.errstate(divide="ignore"):
+        keys = np.log(rng.random(len(w))) / w
+    if num_pick == len(w):
+        return np.arange(len(w))
+    return np.argpartition(keys, len(w)-num_pick)[len(w)-num_pick:]
+
+
+def finish(fitness, num_select, id_elite, id_pick, rng=np.random):
+    id_select = np.concatenate([id_elite, id_pick]).astype(int)
+    if len(id_select) < num_select:
+        # not enough valid fitness, fill with NaN
+        id_nan = np.where(np.isnan(fitness))[0]
+        id_select = np.concatenate([id_select, rng.choice(id_nan, num_select-len(id_select), replace=False)])
+    return np.sort(id_select)
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+# Cheap regression of the fitness used to pre-screen offspring (EA.set_surrogate)
+# Only the last window evaluations are kept, so the cost does not grow with the history
+# The parameters are normalized by (pmax - pmin)
+
+
+class KNNSurrogate:
+    # inverse-distance weighted average of the k nearest evaluated vectors
+    def __init__(self, pmin, pmax, window=2000, k=5):
+        self.pmin = np.array(pmin, dtype=float)
+        self.scale = np.array(pmax, dtype=float) - self.pmin
+        self.scale[self.scale == 0] = 1
+        self.window = int(window)
+        self.k = int(k)
+        self.x = np.zeros([self.window, len(self.pmin)])
+        self.y = np.zeros(self.window)
+        self.num_data = 0 # total number of data given
+        self.min_data = self.k
+
+    def normalize(self, params):
+        # params: [num_params, K] -> [K, num_params]
+        return (np.asarray(params).T - self.pmin) / self.scale
+
+    def update(self, params, fitness):
+        # add evaluated columns of params to the ring buffer, NaN fitness is skipped
+        fitness = np.asarray(fitness, dtype=float)
+        valid = ~np.isnan(fitness)
+        x = self.normalize(params)[valid]
+        nid = (self.num_data + np.arange(len(x))) % self.window
+        self.x[nid] = x
+        self.y[nid] = fitness[valid]
+        self.num_data += len(x)
+
+    def get_data(self):
+        num = min(self.num_data, self.window)
+        return self.x[:num], self.y[:num]
+
+    def is_ready(self):
+        return self.num_data >= self.min_data
+
+    def predict(self, params):
+        x_data, y_data = self.get_data()
+        x = self.normalize(params)
+        d2 = np.sum(x**2, axis=1)[:, None] + np.sum(x_data**2, axis=1)[None, :] - 2 * x @ x_data.T
+        d2 = np.maximum(d2, 0)
+        k = min(self.k, len(y_data))
+        id_near = np.argpartition(d2, k-1, axis=1)[:, :k]
+        w = 1 / (np.sqrt(np.take_along_axis(d2, id_near, axis=1)) + 1e-12)
+        return np.sum(w * y_data[id_near], axis=1) / np.sum(w, axis=1)
+
+
+class RBFSurrogate(KNNSurrogate):
+    # Gaussian RBF interpolation over the window, refitted when new data is added
+    def __init__(self, pmin, pmax, window=300, width=None, reg=1e-6):
+        super().__init__(pmin, pmax, window=window, k=1)
+        self.width = width
+        self.reg = reg
+        self.weight = None
+        self.min_data = 2
+
+    def update(self, params, fitness):
+        super().update(params, fitness)
+        self.weight = None
+
+    def fit(self):
+        x_data, y_data = self.get_data()
+        d2 = np.sum((x_data[:, None, :] - x_data[None, :, :])**2, axis=2)
+        if self.width is None:
+            # median distance between the data
+            width = np.sqrt(np.median(d2[d2 > 0])) if np.any(d2 > 0) else 1
+        else:
+            width = self.width
+        self.fit_width = width
+        self.y_mean = np.mean(y_data)
+        phi = np.exp(-d2 / (2 * width**2)) + self.reg * np.eye(len(y_data))
+        self.weight = np.linalg.solve(phi, y_data - self.y_mean)
+
+    def predict(self, params):
+        if self.weight is None:
+            self.fit()
+        x_data, _ = self.get_data()
+        x = self.normalize(params)
+        d2 = np.sum((x[:, None, :] - x_data[None, :, :])**2, axis=2)
+        return np.exp(-d2 / (2 * self.fit_width**2)) @ self.weight + self.y_mean
+
+
+SURROGATES = {"knn": KNNSurrogate, "rbf": RBFSurrogate}
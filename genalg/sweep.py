@@ -0,0 +1,144 @@
+import numpy as np
+import itertools
+import os
+import time
+from .evolve import EA
+from .evaluator import PoolEvaluator, SerialEvaluator
+
+
+class Sweep:
+    """
+    Run EA for every combination of grid (EA constructor kwargs) and seeds
+    All runs step together, and the offspring of every run are evaluated in one map
+    through a shared evaluator, so the workers are kept busy with the jobs of all runs.
+    The fitness is given to each EA with tell (EA.evaluate, its cache and fault tolerance are not used),
+    the evaluations are counted by EA.record_evaluations
+    Each run logs to log_dir/run<N>, and summary.csv / trace.csv are written to log_dir
+
+    grid: {"mu": [2, 3], "crossover_type": ["pcx", "undx"], ...}
+    kwargs: common EA constructor kwargs
+    """
+    def __init__(self, num_params, fobj, pmin, pmax, grid, seeds=(0,), log_dir="./log", batch=False,
+                 num_process=4, evaluator=None, **kwargs):
+        self.num_params = num_params
+        self.fobj = fobj
+        self.pmin = pmin
+        self.pmax = pmax
+        self.grid = grid
+        self.seeds = list(seeds)
+        self.log_dir = log_dir
+        self.batch = batch
+        self.num_process = num_process
+        self.evaluator = evaluator
+        self.kwargs = kwargs
+
+    def get_configs(self):
+        keys = list(self.grid.keys())
+        return [dict(zip(keys, vals)) for vals in itertools.product(*[self.grid[k] for k in keys])]
+
+    def make_runs(self):
+        runs = []
+        for config in self.get_configs():
+            for seed in self.seeds:
+                log_dir = os.path.join(self.log_dir, "run%d"%(len(runs)))
+                os.makedirs(log_dir, exist_ok=True)
+                kwargs = dict(self.kwargs)
+                kwargs.update(config)
+                solver = EA(self.num_params, log_dir=log_dir, seed=seed, **kwargs)
+                solver.set_object_func(self.fobj, batch=self.batch)
+                solver.set_min_max(self.pmin, self.pmax)
+                solver.check_setting()
+                runs.append({"config": config, "seed": seed, "solver": solver, "num_eval": 0, "trace": []})
+        return runs
+
+    def evaluate(self, evaluator, params_set, job_ids_set):
+        # evaluate the parameter sets of all runs at once
+        params = np.concatenate(params_set, axis=1)
+        job_ids = np.concatenate([np.asarray(ids) for ids in job_ids_set])
+        if self.batch:
+            id_split = np.array_split(np.arange(len(job_ids)), evaluator.num_workers)
+            args = [[params[:, ids], job_ids[ids]] for ids in id_split if len(ids) > 0]
+            fitness = np.concatenate([np.asarray(res) for res in evaluator.map(self.fobj, args)])
+        else:
+            args = [[params[:, n], job_ids[n]] for n in range(len(job_ids))]
+            fitness = np.array(evaluator.map(self.fobj, args), dtype=float)
+
+        bounds = np.cumsum([0] + [p.shape[1] for p in params_set])
+        return [fitness[bounds[n]:bounds[n+1]] for n in range(len(params_set))]
+
+    def step(self, runs, fn):
+        # each solver draws from its own random stream (seeded by the seed of the run)
+        return [fn(run["solver"]) for run in runs]
+
+    def run(self, max_iter=100):
+        runs = self.make_runs()
+        evaluator = self.evaluator
+        if evaluator is None:
+            evaluator = PoolEvaluator(self.num_process) if self.num_process > 1 else SerialEvaluator()
+
+        t0 = time.time()
+        try:
+            # initialization
+            def ask_init(solver):
+                solver.sample_population()
+                return solver.param_vec, solver.count_jobs(solver.num_parent)
+
+            asks = self.step(runs, ask_init)
+            fitness = self.evaluate(evaluator, [a[0] for a in asks], [a[1] for a in asks])
+            for run, (params, job_ids), fit in zip(runs, asks, fitness):
+                run["solver"].record_evaluations(params, fit, job_ids)
+                run["solver"].set_fitness(np.arange(len(fit)), fit)
+                run["solver"].reset_job_id()
+                self.update_trace(run)
+
+            for n in range(max_iter):
+                asks = self.step(runs, lambda solver: solver.ask())
+                fitness = self.evaluate(evaluator, [a[0] for a in asks], [a[1] for a in asks])
+                for run, (offspring, job_ids), fit in zip(runs, asks, fitness):
+                    run["solver"].record_evaluations(offspring, fit, job_ids)
+                    run["solver"].tell(offspring, fit, job_ids)
+                    run["solver"].print_log()
+                    self.update_trace(run)
+        finally:
+            if self.evaluator is None:
+                evaluator.close()
+            for run in runs:
+                run["solver"].close()
+
+        self.elapsed = time.time() - t0
+        self.runs = runs
+        self.write_summary()
+        return self.summary()
+
+    def update_trace(self, run):
+        run["num_eval"] = run["solver"].num_eval
+        scores = run["solver"].fit_score
+        best = np.nanmax(scores) if np.any(~np.isnan(scores)) else np.nan
+        run["trace"].append((run["num_eval"], best))
+
+    def summary(self):
+        # best fitness of each configuration, averaged over the seeds
+        table = []
+        for config in self.get_configs():
+            runs = [run for run in self.runs if run["config"] == config]
+            best = np.array([run["trace"][-1][1] for run in runs])
+            table.append({"config": config, "num_eval": runs[0]["num_eval"], "best_mean": float(np.nanmean(best)),
+                          "best_std": float(np.nanstd(best)), "best_max": float(np.nanmax(best))})
+        return table
+
+    def write_summary(self):
+        with open(os.path.join(self.log_dir, "summary.csv"), "w") as fid:
+            fid.write("run,config,seed,num_eval,best\n")
+            for n, run in enumerate(self.runs):
+                fid.write("%d,\"%s\",%d,%d,%f\n"%(n, run["config"], run["seed"], run["num_eval"], run["trace"][-1][1]))
+
+        with open(os.path.join(self.log_dir, "trace.csv"), "w") as fid:
+            fid.write("run,num_eval,best\n")
+            for n, run in enumerate(self.runs):
+                for num_eval, best in run["trace"]:
+                    fid.write("%d,%d,%f\n"%(n, num_eval, best))
+
+    def print_summary(self):
+        print("%-60s %10s %14s %12s"%("config", "num_eval", "best (mean)", "best (std)"))
+        for row in self.summary():
+            print("%-60s %10d %14.6f %12.6f"%(row["config"], row["num_eval"], row["best_mean"], row["best_std"]))